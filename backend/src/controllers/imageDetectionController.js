@@ -1,6 +1,6 @@
 const axios = require("axios");
-const FormData = require("form-data");
 const fs = require("fs");
+const path = require("path");
 const Violation = require("../models/Violation");
 
 // Detect violations in image
@@ -19,22 +19,26 @@ exports.detectImage = async (req, res) => {
 
     const imagePath = req.file.path;
 
-    // Create form data to send to ML server
-    const formData = new FormData();
-    formData.append("image", fs.createReadStream(imagePath));
-
     console.log("Sending image to ML server for detection");
 
-    // Send image to ML server for detection
-    const mlResponse = await axios.post(
-      "http://localhost:8000/detect/image",
-      formData,
-      {
-        headers: {
-          ...formData.getHeaders(),
-        },
-      }
-    );
+    // Co-located ML server sharing our upload folder (its SHARED_UPLOAD_DIR):
+    // send only the path and let it read the file itself. Otherwise stream the
+    // file as a raw image body, without multipart encoding.
+    const mlResponse =
+      process.env.ML_SHARED_UPLOADS === "1"
+        ? await axios.post("http://localhost:8000/detect/image", {
+            path: path.resolve(imagePath),
+          })
+        : await axios.post(
+            "http://localhost:8000/detect/image",
+            fs.createReadStream(imagePath),
+            {
+              headers: {
+                "Content-Type": req.file.mimetype,
+                "Content-Length": req.file.size,
+              },
+            }
+          );
 
     const detectionResult = mlResponse.data;
     console.log("ML server response:", detectionResult);
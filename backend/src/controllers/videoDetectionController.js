@@ -1,6 +1,7 @@
 const axios = require("axios");
 const FormData = require("form-data");
 const fs = require("fs");
+const readline = require("readline");
 const Violation = require("../models/Violation");
 
 // Detect violations in video
@@ -25,38 +26,62 @@ exports.detectVideo = async (req, res) => {
 
     console.log("Sending video to ML server for detection");
 
-    // Send video to ML server for detection
+    // Ask for NDJSON so each violation arrives as soon as the ML server finds it
     const mlResponse = await axios.post(
-      "http://localhost:8000/detect/video",
+      "http://localhost:8000/detect/video?stream=ndjson",
       formData,
       {
         headers: {
           ...formData.getHeaders(),
         },
+        responseType: "stream",
       }
     );
 
-    const detectionResult = mlResponse.data;
-    console.log("ML server response:", detectionResult);
+    const violations = [];
+    const events = [];
+    let summary = null;
 
-    // If violation detected, create a violation record
-    if (detectionResult.violation) {
-      console.log("Violation detected, creating record");
+    // One JSON message per line: {event: "violation" | "progress" | "done" | "error", data}
+    const lines = readline.createInterface({ input: mlResponse.data });
+    for await (const line of lines) {
+      if (!line.trim()) continue;
+      const message = JSON.parse(line);
 
-      const violation = await Violation.create({
-        officerId: req.user.id,
-        vehicleNumber: req.body.vehicleNumber || "Unknown", // Assuming vehicleNumber might be passed
-        type: detectionResult.vehicle === "bike" ? "Helmet" : "Seatbelt",
-        fine: 500, // Example fine amount
-        videoUrl: videoPath,
-        // Add other fields as needed
-      });
+      if (message.event === "violation") {
+        const event = message.data;
+        const violation = await Violation.create({
+          officerId: req.user.id,
+          vehicleNumber:
+            event.vehicleNumber !== "Unknown"
+              ? event.vehicleNumber
+              : req.body.vehicleNumber || "Unknown",
+          vehicleType: event.vehicle || "Unknown", // "car" or "bike"
+          type: event.type,
+          fine: event.fine || 500,
+          videoUrl: videoPath,
+        });
+        console.log(
+          `Violation record created at ${event.start_time}s (track ${event.track_id}):`,
+          violation.id
+        );
+        violations.push(violation);
+        events.push(event);
+      } else if (message.event === "done") {
+        summary = message.data;
+      } else if (message.event === "error") {
+        throw new Error(message.data.error);
+      }
+    }
 
-      console.log("Violation record created successfully:", violation.id);
+    const detectionResult = { ...summary, events };
+    console.log("ML server summary:", summary);
 
+    if (violations.length > 0) {
       return res.status(201).json({
-        message: "Violation detected and recorded",
-        violation,
+        message: `${violations.length} violation(s) detected and recorded`,
+        violation: violations[0],
+        violations,
         detection: detectionResult,
       });
     } else {
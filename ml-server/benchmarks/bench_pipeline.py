@@ -0,0 +1,330 @@
+"""
+Stage-level micro-benchmarks for the detection pipeline.
+
+Every stage is timed on its own, on synthetic frames at several resolutions
+(and optionally on fixture images), with a fresh FrameContext per run so
+per-frame memoization never hides the work:
+
+    decode                         load_image on the encoded JPEG
+    classify_vehicle               yolov8n pass + vehicle typing
+    detect_helmet, detect_seatbelt helmet/seatbelt model pass + verdict
+    detect_license_plate           plate localization (no vehicle regions)
+    validate_license_plate_region  on a plate crop
+    extract_vehicle_number         OCR cascade on a plate crop (cache cleared)
+
+Results are written as JSON. With --baseline, the median of every stage is
+compared to the baseline run and the script exits 1 when any stage is slower
+by more than its threshold.
+
+    python benchmarks/bench_pipeline.py --output bench.json
+    python benchmarks/bench_pipeline.py --baseline bench.json --threshold 0.15 --stage-threshold extract_vehicle_number=0.3
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+ML_SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ML_SERVER_DIR, "src"))
+# Stages run one caller at a time: micro-batching would only add its collection wait to every pass
+os.environ.setdefault("MICRO_BATCH_WAIT_MS", "0")
+
+import cv2
+import numpy as np
+
+from detector.helmet_detector import detect_helmet
+from detector.license_plate_detector import (
+    PLATE_CACHE,
+    detect_license_plate,
+    extract_vehicle_number,
+    validate_license_plate_region,
+)
+from detector.ocr_service import setup_ocr
+from detector.seatbelt_detector import detect_seatbelt
+from detector.vehicle_classifier import classify_vehicle
+from utils.frame import FrameContext
+from utils.preprocess import load_image
+
+RESOLUTIONS = {
+    "480p": (640, 480),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+STAGES = (
+    "decode",
+    "classify_vehicle",
+    "detect_helmet",
+    "detect_seatbelt",
+    "detect_license_plate",
+    "validate_license_plate_region",
+    "extract_vehicle_number",
+)
+# Stages that only see the plate crop, so their cost doesn't depend on frame resolution
+PLATE_STAGES = ("validate_license_plate_region", "extract_vehicle_number")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time each detection pipeline stage")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--fixtures", help="directory of real images to benchmark as well")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per stage and frame")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed runs first (model loading, caches)")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed relative slowdown of a stage's median vs the baseline")
+    parser.add_argument("--stage-threshold", action="append", default=[], metavar="STAGE=FRACTION",
+                        help="per-stage override of --threshold (repeatable)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this many ms (timer noise on fast stages)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+# ======================
+# FRAMES
+# ======================
+def synthetic_plate(text="MH20DY2366", size=(400, 100), rng=None):
+    """
+    Plate crop: light background, border, dark characters, mild sensor noise
+    """
+    rng = rng or np.random.default_rng(0)
+    width, height = size
+    plate = np.full((height, width, 3), 235, dtype=np.uint8)
+    cv2.rectangle(plate, (2, 2), (width - 3, height - 3), (20, 20, 20), max(2, height // 30))
+    scale = height / 45
+    cv2.putText(plate, text, (int(width * 0.05), int(height * 0.7)), cv2.FONT_HERSHEY_SIMPLEX,
+                scale, (15, 15, 15), max(2, int(scale * 2.5)), cv2.LINE_AA)
+    noise = rng.normal(0, 6, plate.shape)
+    return np.clip(plate + noise, 0, 255).astype(np.uint8)
+
+
+def synthetic_scene(width, height, rng):
+    """
+    Road scene: textured background, a vehicle-like body and a plate on its lower part
+    """
+    scene = rng.integers(70, 110, (height, width, 3), dtype=np.uint8)
+    scene = cv2.GaussianBlur(scene, (0, 0), max(1.0, width / 640))
+    vx1, vy1 = int(width * 0.3), int(height * 0.25)
+    vx2, vy2 = int(width * 0.7), int(height * 0.9)
+    cv2.rectangle(scene, (vx1, vy1), (vx2, vy2), (40, 40, 150), -1)
+    cv2.rectangle(scene, (vx1 + (vx2 - vx1) // 8, vy1 + (vy2 - vy1) // 8),
+                  (vx2 - (vx2 - vx1) // 8, vy1 + (vy2 - vy1) // 2), (160, 150, 140), -1)
+
+    plate_w = int((vx2 - vx1) * 0.35)
+    plate_h = max(12, plate_w // 4)
+    plate = synthetic_plate(size=(plate_w, plate_h), rng=rng)
+    px = (vx1 + vx2 - plate_w) // 2
+    py = vy2 - plate_h - (vy2 - vy1) // 12
+    scene[py:py + plate_h, px:px + plate_w] = plate
+    return scene
+
+
+def load_frames(args):
+    """
+    [(label, bgr)] for every requested resolution plus any fixtures
+    """
+    rng = np.random.default_rng(args.seed)
+    frames = []
+    for label in args.resolutions:
+        width, height = RESOLUTIONS[label]
+        frames.append((label, synthetic_scene(width, height, rng)))
+    if args.fixtures:
+        for path in sorted(glob.glob(os.path.join(args.fixtures, "*"))):
+            image = cv2.imread(path)
+            if image is not None:
+                frames.append((f"fixture:{os.path.basename(path)}", image))
+    return frames
+
+
+# ======================
+# TIMING
+# ======================
+def time_stage(fn, make_input, repeat, warmup):
+    """
+    Milliseconds per call of fn(make_input()); input preparation isn't timed
+    """
+    for _ in range(warmup):
+        fn(make_input())
+    samples = []
+    for _ in range(repeat):
+        value = make_input()
+        start = time.perf_counter()
+        fn(value)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p90_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "stdev_ms": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+    }
+
+
+def stage_runner(stage, bgr, jpeg, plate):
+    """
+    (fn, make_input) for a stage on one frame
+    """
+    fresh = lambda: FrameContext.from_bgr(bgr)
+    if stage == "decode":
+        return load_image, lambda: FrameContext.from_bytes(jpeg)
+    if stage == "classify_vehicle":
+        return classify_vehicle, fresh
+    if stage == "detect_helmet":
+        return detect_helmet, fresh
+    if stage == "detect_seatbelt":
+        return detect_seatbelt, fresh
+    if stage == "detect_license_plate":
+        return lambda frame: detect_license_plate(frame, vehicle_regions=[]), fresh
+    if stage == "validate_license_plate_region":
+        return validate_license_plate_region, lambda: plate.copy()
+    if stage == "extract_vehicle_number":
+        def make_input():
+            PLATE_CACHE.clear()
+            return plate.copy()
+        return extract_vehicle_number, make_input
+    raise ValueError(stage)
+
+
+def run(args):
+    frames = load_frames(args)
+    ocr_engine = setup_ocr()[0] if "extract_vehicle_number" in args.stages else None
+    plate = synthetic_plate(rng=np.random.default_rng(args.seed))
+
+    results = {}
+    for label, bgr in frames:
+        _, encoded = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        jpeg = encoded.tobytes()
+        for stage in args.stages:
+            if stage in PLATE_STAGES and label != frames[0][0]:
+                continue
+            key = f"{stage}@plate" if stage in PLATE_STAGES else f"{stage}@{label}"
+            if stage == "extract_vehicle_number" and ocr_engine is None:
+                results[key] = {"skipped": "no OCR backend"}
+                continue
+            fn, make_input = stage_runner(stage, bgr, jpeg, plate)
+            try:
+                stats = time_stage(fn, make_input, args.repeat, args.warmup)
+            except Exception as e:
+                results[key] = {"error": str(e)}
+                print(f"{key:<48} failed: {e}")
+                continue
+            stats.update({"stage": stage, "input": "plate" if stage in PLATE_STAGES else label,
+                          "shape": list(plate.shape[:2] if stage in PLATE_STAGES else bgr.shape[:2])})
+            results[key] = stats
+            print(f"{key:<48} median {stats['median_ms']:9.2f}ms  p90 {stats['p90_ms']:9.2f}ms")
+    return results, ocr_engine
+
+
+def environment(ocr_engine):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ML_SERVER_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    versions = {"numpy": np.__version__, "opencv": cv2.__version__}
+    for module in ("torch", "ultralytics", "onnxruntime"):
+        mod = sys.modules.get(module)
+        if mod is not None:
+            versions[module] = getattr(mod, "__version__", None)
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "ocr_engine": ocr_engine,
+        "versions": versions,
+        "env": {k: v for k, v in os.environ.items()
+                if k.startswith(("INFERENCE_", "MODEL_", "OCR_", "PLATE_", "OMP_"))},
+    }
+
+
+# ======================
+# BASELINE COMPARISON
+# ======================
+def stage_thresholds(args):
+    thresholds = {}
+    for item in args.stage_threshold:
+        stage, _, value = item.partition("=")
+        if stage not in STAGES or not value:
+            raise SystemExit(f"--stage-threshold expects STAGE=FRACTION, got '{item}'")
+        thresholds[stage] = float(value)
+    return thresholds
+
+
+def compare(results, baseline, args):
+    """
+    Per-stage change vs the baseline; a regression is a median slower by more
+    than the stage's threshold (and by at least --min-delta-ms)
+    """
+    thresholds = stage_thresholds(args)
+    comparison = {}
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous or "median_ms" not in previous or "median_ms" not in current:
+            continue
+        before, after = previous["median_ms"], current["median_ms"]
+        change = (after - before) / before if before > 0 else 0.0
+        threshold = thresholds.get(current["stage"], args.threshold)
+        regressed = change > threshold and after - before >= args.min_delta_ms
+        comparison[key] = {
+            "baseline_ms": before,
+            "current_ms": after,
+            "change": round(change, 4),
+            "threshold": threshold,
+            "regressed": regressed,
+        }
+        if regressed:
+            regressions.append(key)
+    return comparison, regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results, ocr_engine = run(args)
+    report = {
+        "environment": environment(ocr_engine),
+        "config": {"repeat": args.repeat, "warmup": args.warmup, "seed": args.seed,
+                   "resolutions": {label: RESOLUTIONS[label] for label in args.resolutions}},
+        "results": results,
+    }
+
+    code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison, regressions = compare(results, baseline, args)
+        report["baseline"] = {"path": args.baseline, "commit": baseline.get("environment", {}).get("commit")}
+        report["comparison"] = comparison
+        report["regressions"] = regressions
+        for key, entry in comparison.items():
+            flag = "REGRESSION" if entry["regressed"] else ""
+            print(f"{key:<48} {entry['baseline_ms']:9.2f}ms -> {entry['current_ms']:9.2f}ms "
+                  f"({entry['change']:+.1%}) {flag}")
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed past their threshold")
+            code = 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
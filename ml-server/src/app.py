@@ -1,41 +1,131 @@
+import hashlib
+import logging
 import os
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import threading
+import time
+from contextlib import contextmanager
 
-from detector.helmet_detector import detect_helmet
-from detector.seatbelt_detector import detect_seatbelt
-from detector.vehicle_classifier import classify_vehicle
-from detector.license_plate_detector import extract_vehicle_number, set_ocr_globals
-from PIL import Image
-import io
+from utils.log import configure_logging
+from utils.startup import mark_ready, log_startup_report, startup_report, timed
 
-# OCR: try to import pytesseract first, then easyocr as a fallback
+configure_logging()
+logger = logging.getLogger("app")
+
+with timed("import", "flask"):
+    from flask import Flask, Response, g, request, jsonify, stream_with_context
+    from flask_cors import CORS
+
+# Detectors import ultralytics/torch, pytesseract and easyocr lazily, on first use
+with timed("import", "pipeline"):
+    from detector.license_plate_detector import plate_cache_stats
+    from detector.model_registry import preload as preload_models
+    from detector.ocr_service import setup_ocr
+    from pipeline import analyze_frame, analyze_frames, analyze_vehicles, analyze_video, iter_video
+    from utils.frame import FrameContext
+    from utils.ingest import open_shared_file
+    from utils.lru_cache import LruCache
+    from utils.metrics import REGISTRY, REQUEST_SECONDS, end_trace, span, start_trace, summarize_spans
+    from utils.video import save_upload, video_info
+
+with timed("import", "jobs"):
+    from jobs import JobStore, JobWorkerPool
+
+# Sampled video frames decoded and analyzed together; bounds memory per request
+VIDEO_BATCH_SIZE = int(os.environ.get("VIDEO_BATCH_SIZE", "8"))
+# /detect/batch limits: images per request, and images decoded/inferred together
+BATCH_MAX_IMAGES = int(os.environ.get("BATCH_MAX_IMAGES", "1000"))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", "16"))
+# Directory /detect/image may read files from by path ({"path": ...}) when the backend shares
+# its upload folder with this server; unset disables path ingest
+SHARED_UPLOAD_DIR = os.environ.get("SHARED_UPLOAD_DIR")
+# /detect/video streaming formats (stream=<name> or the matching Accept header)
+STREAM_FORMATS = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
+
+# /detect/image analysis modes
+ANALYSIS_MODES = {
+    "frame": analyze_frame,
+    "vehicles": lambda frame: analyze_vehicles([frame])[0],
+}
+
+# /detect/image results keyed by mode and SHA-256 of the upload (RESULT_CACHE_SIZE=0 disables)
+RESULT_CACHE = LruCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", "256")),
+    ttl=float(os.environ.get("RESULT_CACHE_TTL", "3600")) or None,
+)
+
+# ======================
+# LAZY INITIALIZATION
+# ======================
 OCR_ENGINE = None
 PYTESSERACT = None
 EASYOCR_READER = None
-try:
-    import pytesseract as _pyt
-    # Set Tesseract path for Windows (adjust if installed elsewhere)
-    _pyt.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-    PYTESSERACT = _pyt
-    OCR_ENGINE = 'pytesseract'
-except Exception as e:
-    print(f"pytesseract failed to load: {e}")
+OCR_SERVICE = None
+_ocr_loaded = False
+_init_lock = threading.Lock()
+
+# Set once models and OCR are loaded and a warm-up inference has run
+READY = threading.Event()
+INIT_ERROR = None
+_init_pid = None
+
+
+def init_ocr():
+    """
+    Pick and load the OCR backend on first call: resident in-process Tesseract
+    workers (tesserocr), then pytesseract, then easyocr
+    """
+    global OCR_ENGINE, PYTESSERACT, EASYOCR_READER, OCR_SERVICE, _ocr_loaded
+    if _ocr_loaded:
+        return
+    with _init_lock:
+        if _ocr_loaded:
+            return
+        OCR_ENGINE, PYTESSERACT, EASYOCR_READER, OCR_SERVICE = setup_ocr()
+        _ocr_loaded = True
+
+
+def load_resources(before_fork=False):
+    """
+    Load OCR and every YOLO model once for the whole process (no inference).
+    before_fork (serve.py's master) skips models that must be loaded after fork.
+    """
+    init_ocr()
+    preload_models(before_fork=before_fork)
+
+
+def warm_up():
+    """
+    Load everything, run one dummy inference through each model, then mark the process ready
+    """
+    global INIT_ERROR
     try:
-        import easyocr
-        # Create reader lazily (may be slow) — do it once
-        try:
-            EASYOCR_READER = easyocr.Reader(['en'], gpu=False)
-            OCR_ENGINE = 'easyocr'
-        except Exception as e:
-            print(f"easyocr failed to load: {e}")
-            OCR_ENGINE = None
+        load_resources()
+        preload_models(warmup=True)
     except Exception as e:
-        print(f"easyocr import failed: {e}")
-        OCR_ENGINE = None
+        INIT_ERROR = str(e)
+        logger.error(f"Initialization failed: {e}")
+        return
+    mark_ready()
+    READY.set()
+    log_startup_report()
+
+
+def start_warm_up():
+    """
+    warm_up in a background thread, so the server accepts requests (and answers
+    /ready with 503) while models load. Threads don't survive fork, so this is
+    per process.
+    """
+    global _init_pid
+    if _init_pid == os.getpid() or READY.is_set():
+        return
+    _init_pid = os.getpid()
+    threading.Thread(target=warm_up, name="ml-warm-up", daemon=True).start()
 
-# Set OCR globals in the detector module
-set_ocr_globals(OCR_ENGINE, PYTESSERACT, EASYOCR_READER)
+
+# serve.py sets ML_BACKGROUND_INIT=0: it loads in the master and warms up each worker after fork
+if os.environ.get("ML_BACKGROUND_INIT", "1") == "1":
+    start_warm_up()
 
 app = Flask(__name__)
 CORS(app)
@@ -50,93 +140,253 @@ def home():
         "status": "OK"
     })
 
+# ======================
+# READINESS ROUTE
+# ======================
+@app.route("/ready", methods=["GET"])
+def ready():
+    return jsonify(readiness()), 200 if READY.is_set() else 503
+
+
+def readiness():
+    body = {"ready": READY.is_set(), "startup": startup_report()}
+    if INIT_ERROR:
+        body["error"] = INIT_ERROR
+    return body
+
+
+def unavailable_error():
+    """
+    Why the detectors can't run right now (failed initialization or a model
+    that won't load), or None. Loads any model not loaded yet.
+    """
+    if INIT_ERROR:
+        return INIT_ERROR
+    try:
+        preload_models()
+    except Exception as e:
+        return str(e)
+    return None
+
+
+# Routes that must not wait for OCR and the models to load
+LIGHT_ENDPOINTS = {"home", "ready", "stats", "metrics", "get_job", "get_job_result", "cancel_job"}
+
+
+@app.before_request
+def ensure_resources():
+    # Requests that arrive before warm-up finishes load OCR and the models themselves.
+    # Without the models the detectors would only produce placeholder verdicts, so refuse instead.
+    if request.endpoint is None or request.endpoint in LIGHT_ENDPOINTS:
+        return None
+    init_ocr()
+    error = unavailable_error()
+    if error:
+        return jsonify(dict(readiness(), error=error)), 503
+    return None
+
+# ======================
+# REQUEST TIMING AND METRICS
+# ======================
+# Requests slower than this are always logged with their stage breakdown
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "2000"))
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    start_trace()
+
+
+@app.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.get("request_start", time.perf_counter())
+    spans = end_trace()
+    endpoint = request.endpoint or "unmatched"
+    if endpoint == "metrics":
+        return response
+    REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+
+    ms = round(elapsed * 1000, 2)
+    fields = {"endpoint": endpoint, "status": response.status_code, "ms": ms, "stages": summarize_spans(spans)}
+    if ms >= SLOW_REQUEST_MS:
+        logger.warning(f"Slow request {request.method} {request.path} took {ms}ms", extra=fields)
+    else:
+        logger.info(f"{request.method} {request.path} {response.status_code} {ms}ms", extra=fields)
+    return response
+
+
+def cache_collector():
+    caches = {"result": RESULT_CACHE.stats(), "plate": plate_cache_stats()}
+    metrics = [
+        ("ml_cache_hits_total", "counter", "Cache hits", "hits"),
+        ("ml_cache_misses_total", "counter", "Cache misses", "misses"),
+        ("ml_cache_evictions_total", "counter", "Entries evicted to make room", "evictions"),
+        ("ml_cache_entries", "gauge", "Entries currently cached", "size"),
+        ("ml_cache_hit_ratio", "gauge", "Hits / lookups since start", "hit_rate"),
+    ]
+    return [
+        (name, kind, help_text, [({"cache": cache}, stats[field]) for cache, stats in caches.items()])
+        for name, kind, help_text, field in metrics
+    ]
+
+
+REGISTRY.register_collector(cache_collector)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Per process: under serve.py each scrape is answered by whichever worker accepts it,
+    # so every series is labelled with that worker's pid; aggregate with sum without (pid)
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+# ======================
+# CACHE STATS ROUTE
+# ======================
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "plate_cache": plate_cache_stats(),
+        "result_cache": RESULT_CACHE.stats(),
+    })
+
 # ======================
 # IMAGE DETECTION ROUTE
 # ======================
 @app.route("/detect/image", methods=["POST"])
 def detect_image():
-    if "image" not in request.files:
-        return jsonify({"error": "No image uploaded"}), 400
-
-    image = request.files["image"]
+    # mode=frame (default): one verdict for the frame; mode=vehicles: one per detected vehicle
+    mode = request.values.get("mode", "frame").lower()
+    if mode not in ANALYSIS_MODES:
+        return jsonify({"error": f"'mode' must be one of {', '.join(ANALYSIS_MODES)}"}), 400
 
-    # Read bytes once to avoid consuming the stream and to allow multiple reads
     try:
-        image.stream.seek(0)
-    except Exception:
-        pass
-    data = image.read()
-    size = len(data)
-    filename = getattr(image, 'filename', 'uploaded')
-    print(f"Received image upload: {filename}, size={size} bytes")
+        with image_input() as (data, filename):
+            return _detect_image(data, filename, mode)
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except (FileNotFoundError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
 
-    # Provide BytesIO copies to each processing function
-    buf_for_classify = io.BytesIO(data)
-    buf_for_helmet = io.BytesIO(data)
-    buf_for_seatbelt = io.BytesIO(data)
-    buf_for_ocr = io.BytesIO(data)
+@contextmanager
+def image_input():
+    """
+    (data, name) of the image to analyze, from a multipart 'image' field, a raw
+    image/* (or application/octet-stream) body, or a "path" to a file in
+    SHARED_UPLOAD_DIR, which is memory-mapped for the duration of the request
+    """
+    if "image" in request.files:
+        image = request.files["image"]
+        # Read bytes once to avoid consuming the stream and to allow multiple reads
+        try:
+            image.stream.seek(0)
+        except Exception:
+            pass
+        yield image.read(), getattr(image, 'filename', 'uploaded')
+    elif request.mimetype.startswith("image/") or request.mimetype == "application/octet-stream":
+        data = request.get_data(cache=False)
+        if not data:
+            raise ValueError("Empty request body")
+        yield data, "body"
+    else:
+        path = (request.get_json(silent=True) or {}).get("path") or request.values.get("path")
+        if not path:
+            raise ValueError("No image uploaded")
+        with open_shared_file(path, SHARED_UPLOAD_DIR) as data:
+            yield data, path
+
+
+def _detect_image(data, filename, mode):
+    logger.debug(f"Received image: {filename}, size={len(data)} bytes")
+
+    # Retries of the same upload are answered from the content-addressed result cache
+    cache_key = (mode, hashlib.sha256(data).hexdigest())
+    cached = RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        return jsonify(dict(cached, cache="hit"))
+
+    # Decode once; every stage below reads the views it needs from the shared frame
+    frame = FrameContext.from_bytes(data)
+    try:
+        with span("decode"):
+            frame.pil
+    except Exception as e:
+        logger.warning(f"Image decode failed: {e}")
+        return jsonify({"error": f"Invalid image: {str(e)}"}), 400
 
     # Note: License plate detection removed as yolov8n model doesn't have license plate class
     # OCR will be performed on the full image
-
-    # 🔍 Vehicle classification
     try:
-        vehicle = classify_vehicle(buf_for_classify)
+        result = ANALYSIS_MODES[mode](frame)
     except Exception as e:
-        print(f"Vehicle classification failed: {e}")
+        logger.error(f"Vehicle classification failed: {e}")
         return jsonify({"error": f"Vehicle classification failed: {str(e)}"}), 500
 
-    helmet = False
-    helmet_boxes = []
-    seatbelt = False
-    seatbelt_boxes = []
-    helmet_conf = 0.0
-    seatbelt_conf = 0.0
+    if not cacheable(result):
+        return jsonify(dict(result, cache="skip"))
+    RESULT_CACHE.put(cache_key, result)
+    return jsonify(dict(result, cache="miss" if RESULT_CACHE.enabled else "off"))
+
+
+def cacheable(result):
+    """
+    Only results of a fully healthy run are cached: a failed stage or plate read,
+    or a model that went away meanwhile, must be retried on the next upload
+    """
+    entries = [result] + result.get("vehicles", [])
+    for entry in entries:
+        if "error" in entry or entry.get("errors") or entry.get("vehicleNumber") == "DETECT_FAILED":
+            return False
+    return unavailable_error() is None
+
+# ======================
+# BATCH IMAGE DETECTION ROUTE
+# ======================
+@app.route("/detect/batch", methods=["POST"])
+def detect_batch():
+    uploads = request.files.getlist("images") or request.files.getlist("image")
+    if not uploads:
+        return jsonify({"error": "No images uploaded"}), 400
+    if len(uploads) > BATCH_MAX_IMAGES:
+        return jsonify({"error": f"Too many images (max {BATCH_MAX_IMAGES})"}), 400
+
+    run_ocr = request.values.get("ocr", "1").lower() not in ("0", "false", "no")
+    logger.info(f"Received batch upload: {len(uploads)} images, ocr={run_ocr}")
+
+    results = []
+    # Decode and infer chunk by chunk so only BATCH_CHUNK_SIZE frames are held at once
+    for start in range(0, len(uploads), BATCH_CHUNK_SIZE):
+        chunk = uploads[start:start + BATCH_CHUNK_SIZE]
+        entries = []
+        frames = []
+        for upload in chunk:
+            entry = {"filename": getattr(upload, "filename", None) or "uploaded"}
+            try:
+                frame = FrameContext.from_bytes(upload.read())
+                with span("decode"):
+                    frame.pil
+                frames.append(frame)
+            except Exception as e:
+                entry["error"] = f"Invalid image: {str(e)}"
+                frame = None
+            entries.append((entry, frame))
 
-    # Run appropriate detector
-    if vehicle == "bike":
-        try:
-            helmet, helmet_boxes, helmet_conf = detect_helmet(buf_for_helmet)
-        except Exception as e:
-            print(f"Helmet detection failed: {e}")
-            helmet, helmet_boxes, helmet_conf = False, [], 0.0
-    elif vehicle == "car":
         try:
-            seatbelt, seatbelt_boxes, seatbelt_conf = detect_seatbelt(buf_for_seatbelt)
+            analyzed = iter(analyze_frames(frames, ocr=run_ocr))
         except Exception as e:
-            print(f"Seatbelt detection failed: {e}")
-            seatbelt, seatbelt_boxes, seatbelt_conf = False, [], 0.0
-    # OCR for vehicle number using license plate detection
-    try:
-        img = Image.open(buf_for_ocr).convert("RGB")
-        vehicle_number = extract_vehicle_number(img)
-    except Exception as e:
-        print(f"Vehicle number extraction failed: {e}")
-        vehicle_number = "Unknown"
-
-    # 🚨 Violation logic and fine
-    violation = False
-    fine = 0
-    if vehicle == "bike":
-        if helmet is False:
-            violation = True
-            fine = 500
-    if vehicle == "car":
-        if seatbelt is False:
-            violation = True
-            fine = 500
+            logger.error(f"Batch analysis failed: {e}")
+            return jsonify({"error": f"Batch analysis failed: {str(e)}"}), 500
+
+        for entry, frame in entries:
+            if frame is not None:
+                entry.update(next(analyzed))
+            results.append(entry)
 
     return jsonify({
-        "vehicle": vehicle,
-        "helmet": bool(helmet),
-        "helmet_confidence": float(helmet_conf),
-        "helmet_boxes": helmet_boxes,
-        "seatbelt": bool(seatbelt),
-        "seatbelt_confidence": float(seatbelt_conf),
-        "seatbelt_boxes": seatbelt_boxes,
-        "violation": violation,
-        "fine": fine,
-        "vehicleNumber": vehicle_number,
+        "count": len(results),
+        "violations": sum(1 for r in results if r.get("violation")),
+        "results": results,
     })
 
 # ======================
@@ -149,50 +399,220 @@ def detect_video():
 
     video = request.files["video"]
 
-    from PIL import Image
-    import io
+    # Sampling options: every `stride` frames, or `fps` frames per second of video
+    try:
+        stride = _int_param("stride")
+        fps = _float_param("fps")
+        batch_size = _int_param("batch_size") or VIDEO_BATCH_SIZE
+        # motion=0 analyzes every sampled frame; default follows MOTION_GATE
+        motion = _bool_param("motion")
+        stream = _stream_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Stream the upload to disk so OpenCV can decode it without holding the clip in memory
+    try:
+        path = save_upload(video)
+    except Exception as e:
+        return jsonify({"error": f"Could not store video: {str(e)}"}), 500
+
+    if stream:
+        try:
+            video_info(path)
+        except ValueError as e:
+            _remove(path)
+            return jsonify({"error": f"Invalid video: {str(e)}"}), 400
+        logger.info(f"Streaming video analysis ({stream}): {video.filename}, stride={stride}, fps={fps}")
+        messages = stream_video(path, stream, stride=stride, fps=fps, batch_size=batch_size, motion=motion)
+        return Response(
+            stream_with_context(messages),
+            mimetype=STREAM_FORMATS[stream],
+            # Proxies (nginx) must not buffer the stream or events arrive in one burst at the end
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
-    # Assuming video is uploaded as a file, extract first frame (simplified)
-    # This is a placeholder; real implementation needs video processing library like OpenCV
     try:
-        # For demo, assume we can convert video to image (not accurate)
-        # In practice, use cv2 to read video frames
-        image = Image.open(io.BytesIO(video.read()))  # This won't work for videos, just placeholder
-
-        # 🔍 Vehicle classification
-        vehicle = classify_vehicle(image)
-
-        helmet = None
-        helmet_boxes = []
-        seatbelt = None
-        seatbelt_boxes = []
-
-        if vehicle == "bike":
-            helmet, helmet_boxes = detect_helmet(image)
-
-        elif vehicle == "car":
-            seatbelt, seatbelt_boxes = detect_seatbelt(image)
-
-        # 🚨 Violation logic
-        violation = False
-        if vehicle == "bike" and helmet is False:
-            violation = True
-        if vehicle == "car" and seatbelt is False:
-            violation = True
-
-        return jsonify({
-            "vehicle": vehicle,
-            "helmet": helmet,
-            "helmet_boxes": helmet_boxes,
-            "seatbelt": seatbelt,
-            "seatbelt_boxes": seatbelt_boxes,
-            "violation": violation
-        })
+        logger.info(f"Received video upload: {video.filename}, stride={stride}, fps={fps}, batch_size={batch_size}")
+        result = analyze_video(path, stride=stride, fps=fps, batch_size=batch_size, motion=motion)
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid video: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"Video processing failed: {str(e)}"}), 500
+    finally:
+        _remove(path)
+
+
+def stream_video(path, fmt, **params):
+    """
+    Serialize iter_video messages as they are produced; the upload is deleted
+    when the stream ends, fails or the client disconnects
+    """
+    try:
+        for kind, payload in iter_video(path, **params):
+            yield _stream_message(fmt, kind, payload)
+    except Exception as e:
+        logger.error(f"Streaming video analysis failed: {e}")
+        yield _stream_message(fmt, "error", {"error": f"Video processing failed: {str(e)}"})
+    finally:
+        _remove(path)
+
+
+def _stream_message(fmt, kind, payload):
+    data = app.json.dumps(payload)
+    if fmt == "sse":
+        return f"event: {kind}\ndata: {data}\n\n"
+    return app.json.dumps({"event": kind, "data": payload}) + "\n"
+
+
+def _stream_format():
+    value = request.values.get("stream")
+    if value in (None, ""):
+        # Only an explicit Accept entry streams; */* from generic clients keeps the JSON response
+        accepted = {value for value, _ in request.accept_mimetypes}
+        return next((name for name, mimetype in STREAM_FORMATS.items() if mimetype in accepted), None)
+    if value not in STREAM_FORMATS:
+        raise ValueError(f"'stream' must be one of {', '.join(STREAM_FORMATS)}")
+    return value
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _int_param(name):
+    value = request.values.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer")
+    if parsed <= 0:
+        raise ValueError(f"'{name}' must be positive")
+    return parsed
+
+
+def _bool_param(name):
+    value = request.values.get(name)
+    if value in (None, ""):
+        return None
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"'{name}' must be true or false")
+
+
+def _float_param(name):
+    value = request.values.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        parsed = float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number")
+    if parsed <= 0:
+        raise ValueError(f"'{name}' must be positive")
+    return parsed
+
+# ======================
+# ASYNC JOB ROUTES
+# ======================
+def run_video_job(job, report_progress):
+    init_ocr()
+    error = unavailable_error()
+    if error:
+        raise RuntimeError(f"Models unavailable: {error}")
+    params = job["params"]
+    return analyze_video(
+        job["input_path"],
+        stride=params.get("stride"),
+        fps=params.get("fps"),
+        batch_size=params.get("batch_size") or VIDEO_BATCH_SIZE,
+        progress=report_progress,
+        motion=params.get("motion"),
+    )
+
+
+JOB_STORE = JobStore()
+JOB_WORKERS = JobWorkerPool(
+    JOB_STORE,
+    {"video": run_video_job},
+    workers=int(os.environ.get("JOB_WORKERS", "1")),
+)
+
+
+def start_job_workers():
+    JOB_WORKERS.start()
+
+
+@app.route("/jobs/video", methods=["POST"])
+def submit_video_job():
+    if "video" not in request.files:
+        return jsonify({"error": "No video uploaded"}), 400
+
+    video = request.files["video"]
+    try:
+        params = {
+            "stride": _int_param("stride"),
+            "fps": _float_param("fps"),
+            "batch_size": _int_param("batch_size"),
+            "motion": _bool_param("motion"),
+        }
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # The spooled upload lives until the job finishes, so queued work survives restarts
+    try:
+        path = save_upload(video, directory=JOB_STORE.spool_dir)
+    except Exception as e:
+        return jsonify({"error": f"Could not store video: {str(e)}"}), 500
+
+    job_id = JOB_STORE.submit("video", path, params)
+    start_job_workers()
+    JOB_WORKERS.notify()
+    logger.info(f"Queued video job {job_id}: {video.filename}", extra={"job_id": job_id})
+    return jsonify({"job_id": job_id, "status": "queued"}), 202, {"Location": f"/jobs/{job_id}"}
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = JOB_STORE.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    job = JOB_STORE.get(job_id, with_result=True)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == "done":
+        return jsonify(job["result"])
+    if job["status"] in ("failed", "cancelled"):
+        return jsonify({"error": job["error"] or f"Job {job['status']}", "status": job["status"]}), 410
+    return jsonify({"status": job["status"], "progress": job["progress"]}), 409
+
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    status = JOB_STORE.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({"job_id": job_id, "status": status})
 
 # ======================
 # RUN SERVER
 # ======================
+# Development server; use serve.py for multi-process production serving
 if __name__ == "__main__":
+    # With the debug reloader only the serving child (WERKZEUG_RUN_MAIN) drains the job queue
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_job_workers()
     app.run(host="0.0.0.0", port=8000, debug=True)
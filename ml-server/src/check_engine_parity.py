@@ -0,0 +1,203 @@
+"""
+Parity check between the PyTorch models and an exported inference engine.
+
+Runs every image through both paths and matches detections by class and IoU;
+reports how many boxes agree, how far confidences drift and the latency of
+each path. Exits non-zero when any model falls outside the tolerances.
+
+    python check_engine_parity.py --engine onnx --images ../samples
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from detector.inference_engine import ENGINES, load_model
+from detector.model_registry import DEFAULT_CONF, MODEL_FILES, resolve_model_path
+from utils.tracker import iou_matrix
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare an inference engine against the PyTorch models")
+    parser.add_argument("--engine", choices=[e for e in ENGINES if e != "torch"], default="onnx")
+    parser.add_argument("--images", required=True, help="directory of test images")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES))
+    parser.add_argument("--limit", type=int, default=200, help="maximum images to compare")
+    parser.add_argument("--conf", type=float, default=DEFAULT_CONF)
+    parser.add_argument("--iou", type=float, default=0.9, help="IoU for two boxes to count as the same detection")
+    parser.add_argument("--min-match", type=float, default=0.95,
+                        help="minimum fraction of boxes matched in both directions")
+    parser.add_argument("--conf-tolerance", type=float, default=0.05,
+                        help="maximum confidence difference between matched boxes")
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def load_images(directory, limit=None):
+    paths = sorted(
+        p for p in glob.glob(os.path.join(directory, "**", "*"), recursive=True)
+        if p.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    images = []
+    for path in paths[:limit]:
+        image = cv2.imread(path)
+        if image is not None:
+            images.append((path, image))
+    return images
+
+
+def _array(values):
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+def detections(model, image, conf):
+    """
+    Run model on one BGR image; returns (xyxy, conf, cls) arrays and seconds taken
+    """
+    start = time.perf_counter()
+    result = model(image, conf=conf, verbose=False)[0]
+    elapsed = time.perf_counter() - start
+    boxes = result.boxes
+    return (
+        _array(boxes.xyxy).reshape(-1, 4),
+        _array(boxes.conf).reshape(-1),
+        _array(boxes.cls).reshape(-1).astype(int),
+    ), elapsed
+
+
+def match_detections(reference, candidate, iou_threshold):
+    """
+    Greedy one-to-one matching of same-class boxes, most confident reference
+    boxes first. Returns [(reference index, candidate index, iou)].
+    """
+    ref_boxes, ref_conf, ref_cls = reference
+    cand_boxes, _, cand_cls = candidate
+    ious = iou_matrix(ref_boxes, cand_boxes)
+    ious = np.where(ref_cls[:, None] == cand_cls[None, :], ious, 0.0)
+    matches = []
+    used = set()
+    for i in np.argsort(-ref_conf, kind="stable"):
+        best, best_iou = None, iou_threshold
+        for j in range(len(cand_cls)):
+            if j not in used and ious[i, j] >= best_iou:
+                best, best_iou = j, ious[i, j]
+        if best is not None:
+            used.add(best)
+            matches.append((int(i), best, float(best_iou)))
+    return matches
+
+
+def compare_models(reference, candidate, images, conf=DEFAULT_CONF, iou_threshold=0.9, verdict_conf=0.5):
+    """
+    Agreement and latency of candidate against reference over images.
+    A verdict is the set of classes detected with at least verdict_conf (what
+    the helmet/seatbelt detectors decide on); verdict_agreement is the share
+    of images where both models reach the same verdict.
+    """
+    ref_total = cand_total = matched = 0
+    verdicts_agree = 0
+    verdict_flips = {}
+    ious = []
+    conf_deltas = []
+    ref_seconds = []
+    cand_seconds = []
+
+    # One untimed pass each so lazy setup isn't counted as latency
+    if images:
+        reference(images[0][1], verbose=False)
+        candidate(images[0][1], verbose=False)
+
+    for _, image in images:
+        ref, ref_time = detections(reference, image, conf)
+        cand, cand_time = detections(candidate, image, conf)
+        ref_seconds.append(ref_time)
+        cand_seconds.append(cand_time)
+        ref_total += len(ref[2])
+        cand_total += len(cand[2])
+        for i, j, iou in match_detections(ref, cand, iou_threshold):
+            matched += 1
+            ious.append(iou)
+            conf_deltas.append(abs(float(ref[1][i]) - float(cand[1][j])))
+
+        ref_verdict = set(ref[2][ref[1] >= verdict_conf].tolist())
+        cand_verdict = set(cand[2][cand[1] >= verdict_conf].tolist())
+        if ref_verdict == cand_verdict:
+            verdicts_agree += 1
+        for cls in ref_verdict ^ cand_verdict:
+            label = str(reference.names.get(cls, cls))
+            verdict_flips[label] = verdict_flips.get(label, 0) + 1
+
+    return {
+        "images": len(images),
+        "reference_boxes": ref_total,
+        "candidate_boxes": cand_total,
+        "matched": matched,
+        # recall/precision of the candidate taking the reference as ground truth
+        "recall": matched / ref_total if ref_total else 1.0,
+        "precision": matched / cand_total if cand_total else 1.0,
+        "mean_iou": float(np.mean(ious)) if ious else None,
+        "verdict_agreement": verdicts_agree / len(images) if images else 1.0,
+        "verdict_flips": verdict_flips,
+        "max_conf_delta": float(np.max(conf_deltas)) if conf_deltas else 0.0,
+        "mean_conf_delta": float(np.mean(conf_deltas)) if conf_deltas else 0.0,
+        "reference_ms": 1000 * float(np.median(ref_seconds)) if ref_seconds else None,
+        "candidate_ms": 1000 * float(np.median(cand_seconds)) if cand_seconds else None,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 2
+
+    report = {"engine": args.engine, "models": {}}
+    failed = False
+    compared = {}
+    for name in args.models:
+        weights = resolve_model_path(name)
+        if weights in compared:
+            report["models"][name] = compared[weights]
+            continue
+
+        reference = load_model(weights, engine="torch")
+        candidate = load_model(weights, engine=args.engine)
+        if candidate.engine != args.engine:
+            print(f"{name}: could not load {weights} on {args.engine}")
+            failed = True
+            continue
+
+        stats = compare_models(reference, candidate, images, conf=args.conf, iou_threshold=args.iou)
+        stats["weights"] = os.path.basename(weights)
+        stats["passed"] = (
+            stats["recall"] >= args.min_match
+            and stats["precision"] >= args.min_match
+            and stats["max_conf_delta"] <= args.conf_tolerance
+        )
+        failed = failed or not stats["passed"]
+        compared[weights] = report["models"][name] = stats
+        print(
+            f"{name} ({stats['weights']}): {'PASS' if stats['passed'] else 'FAIL'} "
+            f"matched {stats['matched']}/{stats['reference_boxes']} torch, {stats['candidate_boxes']} {args.engine}, "
+            f"max conf delta {stats['max_conf_delta']:.3f}, "
+            f"torch {stats['reference_ms']:.1f}ms vs {args.engine} {stats['candidate_ms']:.1f}ms"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,17 @@
-from ultralytics import YOLO
-from utils.preprocess import load_image
-import os
-import cv2
-import numpy as np  
+import logging
 
-# Load model once at import to avoid reloading on each request
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "..", "models", "yolo_helmet.pt")
-# If the dedicated helmet model is missing or empty, fall back to the general yolov8n model
-if not os.path.exists(MODEL_PATH) or os.path.getsize(MODEL_PATH) < 1024:
-    MODEL_PATH = os.path.join(BASE_DIR, "..", "models", "yolov8n.pt")
-try:
-    model = YOLO(MODEL_PATH)
-except Exception as e:
-    print(f"Failed to load helmet model at {MODEL_PATH}: {e}")
-    # Final fallback: attempt to load the shipped yolov8n
-    model = YOLO(os.path.join(BASE_DIR, "..", "models", "yolov8n.pt"))
-is_general_model = MODEL_PATH.endswith('yolov8n.pt')
+from detector.model_registry import get_model, is_general_model, predict, predict_batch
+from utils.frame import FrameContext
+
+logger = logging.getLogger(__name__)
 
 
 def detect_helmet(image_file):
     try:
-        img = load_image(image_file)
-        results = model(img)
+        frame = FrameContext.from_any(image_file)
+        model = get_model("helmet")
+        general_model = is_general_model("helmet")
+        results = predict("helmet", frame)
         boxes = []
         detected_classes = []
 
@@ -43,7 +32,7 @@ def detect_helmet(image_file):
                     detected_classes.append(cls_name)
 
                 # If using dedicated helmet model, look for helmet classes
-                if not is_general_model and cls_name and 'helmet' in cls_name:
+                if not general_model and cls_name and 'helmet' in cls_name:
                     boxes.append({
                         'x1': int(box.xyxy[0][0]),
                         'y1': int(box.xyxy[0][1]),
@@ -61,7 +50,7 @@ def detect_helmet(image_file):
                 max_conf = b['confidence']
 
         # If using general model (yolov8n), implement fallback logic
-        if is_general_model:
+        if general_model:
             # Check if motorcycle and person are detected
             has_motorcycle = 'motorcycle' in detected_classes or 'motorbike' in detected_classes or 'bike' in detected_classes
             has_person = 'person' in detected_classes
@@ -69,11 +58,11 @@ def detect_helmet(image_file):
             if has_motorcycle and has_person:
                 # For motorcycle with person, we cannot reliably detect helmet with general model
                 # Return False (no helmet detected) with low confidence to indicate uncertainty
-                print(f"Helmet detector (general model) saw classes: {detected_classes}, assuming no helmet detectable")
+                logger.debug(f"Helmet detector (general model) saw classes: {detected_classes}, assuming no helmet detectable")
                 return False, [], 0.1  # Low confidence to indicate fallback logic
             else:
                 # No motorcycle-person combination, assume not applicable
-                print(f"Helmet detector (general model) saw classes: {detected_classes}, no motorcycle-person detected")
+                logger.debug(f"Helmet detector (general model) saw classes: {detected_classes}, no motorcycle-person detected")
                 return True, [], 0.0  # Not applicable, but return True to avoid false violations
 
         # For dedicated helmet model
@@ -82,10 +71,31 @@ def detect_helmet(image_file):
 
         # Debug: print detected classes if no helmet found or low confidence
         if not boxes or max_conf < CONF_THRESHOLD:
-            print(f"Helmet detector saw classes: {detected_classes}, max_conf={max_conf}")
+            logger.debug(f"Helmet detector saw classes: {detected_classes}, max_conf={max_conf}")
 
         # Final return: helmet presence (bool), boxes list, max confidence
         return helmet_present, boxes, max_conf
     except Exception as e:
-        print(f"Error in helmet detection: {e}")
-        return False, [], 0.0
+        logger.warning(f"Error in helmet detection: {e}")
+        # Never report a failed check as "no helmet": that would be a false violation
+        raise
+
+
+def detect_helmet_batch(images):
+    """
+    detect_helmet for many frames: the helmet model runs over all of them in
+    batched forward passes, then each frame's verdict is read from its results.
+    A frame whose check failed gets the exception in place of its verdict.
+    """
+    frames = [FrameContext.from_any(image) for image in images]
+    try:
+        predict_batch("helmet", frames)
+    except Exception as e:
+        logger.warning(f"Batched helmet inference failed, falling back to per-frame: {e}")
+    results = []
+    for frame in frames:
+        try:
+            results.append(detect_helmet(frame))
+        except Exception as e:
+            results.append(e)
+    return results
@@ -0,0 +1,184 @@
+import logging
+import os
+
+from utils.startup import timed
+
+logger = logging.getLogger(__name__)
+
+# Runtime the YOLO models execute on: torch (eager PyTorch), onnx (ONNX Runtime)
+# or openvino. Exported engines are CPU-oriented; results come back as the same
+# ultralytics Results objects, so detectors don't change.
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "torch").lower()
+# Export missing ONNX/OpenVINO models from the .pt weights on first load
+INFERENCE_AUTO_EXPORT = os.environ.get("INFERENCE_AUTO_EXPORT", "1") == "1"
+# Input size the models are exported (and run) at
+INFERENCE_IMGSZ = int(os.environ.get("INFERENCE_IMGSZ", "640"))
+# Intra-op threads of each ONNX Runtime session (0 keeps ORT's default of one per core);
+# serve.py sets it to the per-worker thread budget
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "0"))
+
+ENGINES = ("torch", "onnx", "openvino")
+# Precisions a model can be served at; int8 runs the quantized ONNX variant on ONNX Runtime
+PRECISIONS = ("fp32", "int8")
+EXPORT_FORMATS = {"onnx": "onnx", "openvino": "openvino"}
+
+_YOLO = None
+
+
+def _yolo_class():
+    # ultralytics (and torch behind it) is imported on first model load, not at import time
+    global _YOLO
+    if _YOLO is None:
+        with timed("import", "ultralytics"):
+            from ultralytics import YOLO
+        _YOLO = YOLO
+    return _YOLO
+
+
+def exported_path(weights_path, engine):
+    """
+    Where the export of weights_path for engine lives (next to the .pt file,
+    where ultralytics writes it)
+    """
+    stem, _ = os.path.splitext(weights_path)
+    if engine == "onnx":
+        return stem + ".onnx"
+    if engine == "openvino":
+        return stem + "_openvino_model"
+    return weights_path
+
+
+def quantized_path(weights_path, precision="int8"):
+    """
+    Where the quantized ONNX variant of weights_path lives (written by quantize_models.py)
+    """
+    stem, _ = os.path.splitext(weights_path)
+    return f"{stem}_{precision}.onnx"
+
+
+def fork_safe(precision="fp32", engine=None):
+    """
+    True when a model at this precision runs on eager PyTorch and so may be loaded
+    before fork. ONNX Runtime and OpenVINO start thread pools that don't survive
+    fork: models on them (every int8 model included) must be loaded in the worker.
+    """
+    return precision == "fp32" and (engine or INFERENCE_ENGINE).lower() not in EXPORT_FORMATS
+
+
+def _limit_ort_threads(model, path):
+    """
+    Run model's ONNX Runtime session with INFERENCE_THREADS intra-op threads.
+    ultralytics creates the session itself with default options when the
+    predictor is set up, so it is rebuilt once, right before the first prediction.
+    """
+    if INFERENCE_THREADS <= 0:
+        return
+
+    def on_predict_start(predictor):
+        backend = predictor.model
+        session = getattr(backend, "session", None)
+        if session is None or getattr(backend, "threads_limited", False):
+            return
+        # GPU sessions are bound to device buffers at setup; only plain CPU sessions are rebuilt
+        if session.get_providers() != ["CPUExecutionProvider"]:
+            return
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = INFERENCE_THREADS
+        options.inter_op_num_threads = 1
+        backend.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        backend.threads_limited = True
+        logger.info(f"{os.path.basename(path)}: ONNX Runtime limited to {INFERENCE_THREADS} threads")
+
+    model.add_callback("on_predict_start", on_predict_start)
+
+
+def export_model(weights_path, engine, imgsz=INFERENCE_IMGSZ):
+    """
+    Export a .pt model for engine and return the exported path. Models get
+    dynamic axes so batched predict_batch and micro-batched passes keep working.
+    """
+    if engine not in EXPORT_FORMATS:
+        raise ValueError(f"Engine '{engine}' has no export format")
+    YOLO = _yolo_class()
+    logger.info(f"Exporting {weights_path} for {engine} (imgsz={imgsz})")
+    kwargs = {"format": EXPORT_FORMATS[engine], "imgsz": imgsz, "dynamic": True}
+    with timed("export", f"{os.path.basename(weights_path)} -> {engine}"):
+        path = YOLO(weights_path).export(**kwargs)
+    return str(path)
+
+
+def _openvino_batch_limit(path):
+    """
+    1 when the OpenVINO export at path has a static input shape (exports made
+    before dynamic=True, or whose metadata doesn't say), else None (no limit)
+    """
+    try:
+        import yaml
+
+        with open(os.path.join(path, "metadata.yaml")) as f:
+            metadata = yaml.safe_load(f) or {}
+        if (metadata.get("args") or {}).get("dynamic"):
+            return None
+    except Exception as e:
+        logger.debug(f"No export metadata for {path}: {e}")
+    logger.warning(f"{path} has a static batch size: frames run through it one at a time "
+                   f"(delete it to re-export with dynamic shapes)")
+    return 1
+
+
+def load_model(weights_path, engine=None, precision="fp32"):
+    """
+    Load weights_path on the configured engine. Falls back to PyTorch when the
+    exported model is missing and can't be exported, or fails to load.
+    precision="int8" loads the quantized variant instead (always on ONNX
+    Runtime), falling back to FP32 when it hasn't been produced.
+    model.max_batch, when set, is the most frames one forward pass may take.
+    """
+    engine = (engine or INFERENCE_ENGINE).lower()
+    if engine not in ENGINES:
+        logger.warning(f"Unknown inference engine '{engine}', using torch")
+        engine = "torch"
+
+    YOLO = _yolo_class()
+    if precision != "fp32":
+        path = quantized_path(weights_path, precision)
+        try:
+            if precision not in PRECISIONS:
+                raise ValueError(f"unknown precision '{precision}'")
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"{path} not found (run quantize_models.py)")
+            with timed("model", f"{os.path.basename(path)} (onnx)"):
+                model = YOLO(path, task="detect")
+            _limit_ort_threads(model, path)
+            model.engine = "onnx"
+            model.precision = precision
+            return model
+        except Exception as e:
+            logger.warning(f"{precision} variant unavailable for {weights_path}, using fp32: {e}")
+
+    if engine != "torch":
+        path = exported_path(weights_path, engine)
+        try:
+            if not os.path.exists(path):
+                if not INFERENCE_AUTO_EXPORT:
+                    raise FileNotFoundError(f"{path} not found (INFERENCE_AUTO_EXPORT=0)")
+                path = export_model(weights_path, engine)
+            with timed("model", f"{os.path.basename(path)} ({engine})"):
+                model = YOLO(path, task="detect")
+            if engine == "onnx":
+                _limit_ort_threads(model, path)
+            else:
+                model.max_batch = _openvino_batch_limit(path)
+            model.engine = engine
+            model.precision = "fp32"
+            return model
+        except Exception as e:
+            logger.warning(f"{engine} engine unavailable for {weights_path}, using torch: {e}")
+
+    with timed("model", os.path.basename(weights_path)):
+        model = YOLO(weights_path)
+    model.engine = "torch"
+    model.precision = "fp32"
+    return model
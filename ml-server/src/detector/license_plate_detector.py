@@ -2,80 +2,69 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
+import json
+import logging
 import os
+import re
+import threading
+
+from detector.ocr_service import PytesseractService
+from utils.frame import FrameContext
+from utils.metrics import OCR_ATTEMPTS, OCR_ATTEMPTS_PER_PLATE, OCR_RESULTS, span
+from utils.phash_cache import PerceptualCache, phash
+
+logger = logging.getLogger(__name__)
 
 # Global OCR variables
 OCR_ENGINE = None
 PYTESSERACT = None
 EASYOCR_READER = None
+# Tesseract backend every image_to_data call goes through (see detector.ocr_service)
+OCR_SERVICE = None
 
-def set_ocr_globals(engine, pytesseract, easyocr_reader):
+def set_ocr_globals(engine, pytesseract, easyocr_reader, ocr_service=None):
     """
     Set global OCR variables
+    Without an explicit ocr_service, Tesseract calls go through pytesseract
     """
-    global OCR_ENGINE, PYTESSERACT, EASYOCR_READER
+    global OCR_ENGINE, PYTESSERACT, EASYOCR_READER, OCR_SERVICE
     OCR_ENGINE = engine
     PYTESSERACT = pytesseract
     EASYOCR_READER = easyocr_reader
+    if ocr_service is None and pytesseract is not None:
+        ocr_service = PytesseractService(pytesseract)
+    OCR_SERVICE = ocr_service
 
 
-def detect_license_plate(image):
+def detect_license_plate(image, vehicle_regions=None):
     """
     Detect license plate region using multiple detection strategies optimized for Indian license plates
+    vehicle_regions: optional vehicle boxes already found by detect_vehicles for this frame
     Returns cropped license plate image or None if not found
     """
+    with span("plate_localization"):
+        return _detect_license_plate(image, vehicle_regions)
+
+
+def _detect_license_plate(image, vehicle_regions):
     try:
-        # Convert PIL to numpy array
-        if isinstance(image, Image.Image):
-            img = np.array(image.convert('RGB'))
-            img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-        else:
-            img = image
+        # Shared decoded frame; PIL inputs become RGB-backed, ndarrays are taken as BGR
+        frame = FrameContext.from_any(image)
+        img = frame.bgr
 
         height, width = img.shape[:2]
-        print(f"Processing image of size {width}x{height}")
+        logger.debug(f"Processing image of size {width}x{height}")
 
-        # Try YOLO model first to detect vehicles, then look for license plates within them
-        vehicle_regions = []
-        try:
-            from ultralytics import YOLO
-            import os
-
-            BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            MODEL_PATH = os.path.join(BASE_DIR, "..", "models", "yolov8n.pt")
-
-            model = YOLO(MODEL_PATH)
-            results = model(img, conf=0.25)  # Lower confidence threshold
-
-            # Look for vehicle classes that might contain license plates
-            vehicle_classes = ['car', 'truck', 'bus', 'motorcycle', 'bicycle', 'vehicle']
-
-            for result in results:
-                for box in result.boxes:
-                    try:
-                        cls_idx = int(box.cls[0]) if hasattr(box.cls, '__len__') else int(box.cls)
-                    except Exception:
-                        cls_idx = None
-
-                    cls_name = None
-                    if cls_idx is not None and cls_idx in model.names:
-                        cls_name = str(model.names[cls_idx]).lower()
-
-                    # Check for vehicle classes
-                    if cls_name and any(keyword in cls_name for keyword in vehicle_classes):
-                        vehicle_regions.append({
-                            'x1': int(box.xyxy[0][0]),
-                            'y1': int(box.xyxy[0][1]),
-                            'x2': int(box.xyxy[0][2]),
-                            'y2': int(box.xyxy[0][3]),
-                            'confidence': float(box.conf[0]),
-                            'class': cls_name
-                        })
-
-            print(f"YOLO detected {len(vehicle_regions)} vehicle regions")
+        # Reuse the frame's shared yolov8n vehicle pass to find plate search regions
+        if vehicle_regions is None:
+            vehicle_regions = []
+            try:
+                from detector.vehicle_classifier import detect_vehicles
 
-        except Exception as e:
-            print(f"YOLO vehicle detection failed: {e}")
+                vehicle_regions = detect_vehicles(frame)
+                logger.debug(f"YOLO detected {len(vehicle_regions)} vehicle regions")
+            except Exception as e:
+                logger.warning(f"YOLO vehicle detection failed: {e}")
 
         # If vehicles found, focus license plate detection in those regions
         search_regions = []
@@ -93,129 +82,32 @@ def detect_license_plate(image):
                 plate_x2 = min(width, v_x2 + int(v_width * 0.1))
 
                 search_regions.append((plate_x1, plate_y1, plate_x2, plate_y2))
-                print(f"Searching for license plate in vehicle region: {plate_x1},{plate_y1},{plate_x2},{plate_y2}")
+                logger.debug(f"Searching for license plate in vehicle region: {plate_x1},{plate_y1},{plate_x2},{plate_y2}")
         else:
             # If no vehicles detected, search entire image
             search_regions.append((0, 0, width, height))
 
-        # Advanced image processing for license plate detection
-        print("Performing advanced image processing for license plate detection")
+        # Coarse pass: localize candidates on a downscaled view so the cost of the
+        # filter/edge/morphology stack stays flat as input resolution grows
+        gray = frame.gray
+        scale = plate_search_scale(width, height)
+        if scale < 1.0:
+            work = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                              interpolation=cv2.INTER_AREA)
+            logger.debug(f"Localizing license plates at {work.shape[1]}x{work.shape[0]} (scale {scale:.3f})")
+        else:
+            work = gray
+        work_regions = [tuple(int(round(v * scale)) for v in region) for region in search_regions]
+        license_plate_candidates = localize_plate_candidates(work, work_regions)
 
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-        # Apply bilateral filter to reduce noise while keeping edges sharp
-        gray = cv2.bilateralFilter(gray, 11, 17, 17)
-
-        # Multiple edge detection approaches optimized for license plates
-        edges = []
-
-        # Canny with different thresholds for different contrast levels
-        edges.append(cv2.Canny(gray, 30, 200))  # Good for high contrast plates
-        edges.append(cv2.Canny(gray, 50, 150))  # Good for medium contrast
-        edges.append(cv2.Canny(gray, 70, 180))  # Good for low contrast plates
-
-        # Combine edges
-        combined_edges = edges[0]
-        for edge in edges[1:]:
-            combined_edges = cv2.bitwise_or(combined_edges, edge)
-
-        # Morphological operations to clean up edges and connect plate characters
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (4, 2))  # Horizontal kernel for text
-        combined_edges = cv2.morphologyEx(combined_edges, cv2.MORPH_CLOSE, kernel, iterations=3)
-        combined_edges = cv2.morphologyEx(combined_edges, cv2.MORPH_OPEN, kernel, iterations=1)
-
-        # Find contours
-        contours, hierarchy = cv2.findContours(combined_edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:100]  # Top 100 contours
-
-        license_plate_candidates = []
-
-        for contour in contours:
-            # Skip very small contours
-            area = cv2.contourArea(contour)
-            if area < 300:  # Minimum area for license plate characters
-                continue
-
-            # Get bounding rectangle
-            x, y, w, h = cv2.boundingRect(contour)
-
-            # Check if contour is within search regions
-            in_search_region = False
-            for sx1, sy1, sx2, sy2 in search_regions:
-                if x >= sx1 and y >= sy1 and x + w <= sx2 and y + h <= sy2:
-                    in_search_region = True
-                    break
-            if not in_search_region:
-                continue
-
-            # Calculate aspect ratio
-            aspect_ratio = w / float(h)
-
-            # License plates are typically rectangular
-            # Indian plates: ~3.0-5.0, Motorcycle plates: ~2.0-4.0, Commercial: ~4.0-6.0
-            if not (1.5 <= aspect_ratio <= 7.0):
-                continue
-
-            # Check if dimensions are reasonable for license plates
-            min_plate_width = 50
-            max_plate_width = width * 0.95
-            min_plate_height = 12
-            max_plate_height = height * 0.8
-
-            if not (min_plate_width <= w <= max_plate_width and min_plate_height <= h <= max_plate_height):
-                continue
-
-            # Calculate solidity (area / convex hull area)
-            hull = cv2.convexHull(contour)
-            hull_area = cv2.contourArea(hull)
-            solidity = area / hull_area if hull_area > 0 else 0
-
-            # License plates should have reasonable solidity
-            if solidity < 0.5:  # More lenient
-                continue
-
-            # Check if contour is approximately rectangular
-            peri = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.06 * peri, True)  # More lenient approximation
-
-            # Should be roughly rectangular (4-10 corners)
-            if not (4 <= len(approx) <= 12):
-                continue
-
-            # Additional check: ensure the contour isn't too elongated or irregular
-            rect_area = w * h
-            extent = area / rect_area if rect_area > 0 else 0
-            if extent < 0.4:  # Contour should fill reasonable portion of bounding box
-                continue
-
-            # Calculate score based on multiple factors
-            aspect_score = 1.0 if 2.5 <= aspect_ratio <= 5.5 else 0.7
-            size_score = min(w * h / (width * height * 0.1), 1.0)  # Allow larger plates
-            position_score = 1.0 if y > height * 0.15 else 0.6  # Prefer lower half
-            solidity_score = min(solidity * 2, 1.0)  # Boost solidity score
-            extent_score = min(extent * 2.5, 1.0)  # Boost extent score
-
-            total_score = aspect_score * size_score * position_score * solidity_score * extent_score
-
-            license_plate_candidates.append({
-                'contour': contour,
-                'bbox': (x, y, w, h),
-                'score': total_score,
-                'area': area,
-                'aspect_ratio': aspect_ratio,
-                'solidity': solidity,
-                'extent': extent
-            })
-
-        # Sort candidates by score
-        license_plate_candidates.sort(key=lambda x: x['score'], reverse=True)
-
-        print(f"Found {len(license_plate_candidates)} license plate candidates")
+        logger.debug(f"Found {len(license_plate_candidates)} license plate candidates")
 
         # Try top candidates
         for candidate in license_plate_candidates[:15]:  # Check top 15 candidates
-            x, y, w, h = candidate['bbox']
+            # Fine pass: map the box back to native resolution and tighten it there
+            x, y, w, h = _scale_box(candidate['bbox'], 1.0 / scale, width, height)
+            if scale < 1.0:
+                x, y, w, h = refine_plate_box(gray, (x, y, w, h), scale)
 
             # Add generous padding for license plate text
             padding_x = max(10, int(w * 0.2))
@@ -232,17 +124,249 @@ def detect_license_plate(image):
             # Additional validation: check if cropped image has text-like characteristics
             if validate_license_plate_region(license_plate_img):
                 license_plate_pil = Image.fromarray(cv2.cvtColor(license_plate_img, cv2.COLOR_BGR2RGB))
-                print(f"Detected license plate with score {candidate['score']:.3f}, aspect ratio {candidate['aspect_ratio']:.2f}")
+                logger.debug(f"Detected license plate with score {candidate['score']:.3f}, aspect ratio {candidate['aspect_ratio']:.2f}")
                 return license_plate_pil
 
-        print("No valid license plate regions found")
+        logger.debug("No valid license plate regions found")
         return None
 
     except Exception as e:
-        print(f"License plate detection failed: {e}")
+        logger.warning(f"License plate detection failed: {e}")
         return None
 
 
+# ======================
+# Plate localization
+# ======================
+# Long side plate candidates are searched at; larger frames are downscaled for
+# localization and only the candidate boxes are refined at native resolution (0 = off)
+PLATE_SEARCH_MAX_SIDE = int(os.environ.get("PLATE_SEARCH_MAX_SIDE", "1280"))
+# Long side the absolute size thresholds below were tuned at
+PLATE_REFERENCE_SIDE = 1280
+MIN_PLATE_WIDTH = 50
+MIN_PLATE_HEIGHT = 12
+MIN_PLATE_AREA = 300
+
+
+def plate_search_scale(width, height):
+    """
+    Factor (<= 1) frames are downscaled by for the coarse localization pass
+    """
+    longest = max(width, height)
+    if PLATE_SEARCH_MAX_SIDE <= 0 or longest <= PLATE_SEARCH_MAX_SIDE:
+        return 1.0
+    return PLATE_SEARCH_MAX_SIDE / longest
+
+
+def plate_size_limits(width, height):
+    """
+    (min_width, min_height, min_area) for an image of this size: the tuned
+    thresholds scaled with the long side, with floors so tiny images don't
+    accept noise
+    """
+    factor = max(width, height) / PLATE_REFERENCE_SIDE
+    return (
+        max(20, MIN_PLATE_WIDTH * factor),
+        max(8, MIN_PLATE_HEIGHT * factor),
+        max(60, MIN_PLATE_AREA * factor * factor),
+    )
+
+
+def plate_edges(gray):
+    """
+    Edge map the plate contours are taken from
+    """
+    # Apply bilateral filter to reduce noise while keeping edges sharp
+    gray = cv2.bilateralFilter(gray, 11, 17, 17)
+
+    # Canny with different thresholds for different contrast levels
+    combined_edges = cv2.Canny(gray, 30, 200)  # Good for high contrast plates
+    combined_edges = cv2.bitwise_or(combined_edges, cv2.Canny(gray, 50, 150))  # Good for medium contrast
+    combined_edges = cv2.bitwise_or(combined_edges, cv2.Canny(gray, 70, 180))  # Good for low contrast plates
+
+    # Morphological operations to clean up edges and connect plate characters
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (4, 2))  # Horizontal kernel for text
+    combined_edges = cv2.morphologyEx(combined_edges, cv2.MORPH_CLOSE, kernel, iterations=3)
+    return cv2.morphologyEx(combined_edges, cv2.MORPH_OPEN, kernel, iterations=1)
+
+
+def localize_plate_candidates(gray, search_regions):
+    """
+    Scored plate candidates (boxes in gray's coordinates), best first
+    """
+    height, width = gray.shape[:2]
+    contours, hierarchy = cv2.findContours(plate_edges(gray), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return find_plate_candidates(contours, search_regions, width, height)
+
+
+def _scale_box(box, factor, width, height):
+    x, y, w, h = box
+    x1, y1 = max(0, int(x * factor)), max(0, int(y * factor))
+    x2, y2 = min(width, int(round((x + w) * factor))), min(height, int(round((y + h) * factor)))
+    return x1, y1, max(1, x2 - x1), max(1, y2 - y1)
+
+
+def _box_iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def refine_plate_box(gray, box, scale):
+    """
+    Re-localize a coarse box (native coordinates) in a native-resolution window
+    around it, so the crop edges are exact rather than off by up to 1/scale pixels.
+    Keeps the coarse box when no candidate in the window matches it.
+    """
+    height, width = gray.shape[:2]
+    x, y, w, h = box
+    margin_x = int(w * 0.15 + 2 / scale)
+    margin_y = int(h * 0.3 + 2 / scale)
+    wx1, wy1 = max(0, x - margin_x), max(0, y - margin_y)
+    wx2, wy2 = min(width, x + w + margin_x), min(height, y + h + margin_y)
+    window = gray[wy1:wy2, wx1:wx2]
+    if window.size == 0:
+        return box
+
+    local = (x - wx1, y - wy1, w, h)
+    best, best_iou = None, 0.5
+    for candidate in localize_plate_candidates(window, [(0, 0, wx2 - wx1, wy2 - wy1)]):
+        iou = _box_iou(candidate['bbox'], local)
+        if iou > best_iou:
+            best, best_iou = candidate['bbox'], iou
+    if best is None:
+        return box
+    bx, by, bw, bh = best
+    return bx + wx1, by + wy1, bw, bh
+
+
+def _contour_features(contours):
+    """
+    Areas and bounding boxes of all contours at once.
+    Areas use the shoelace formula (what cv2.contourArea computes) and boxes
+    the inclusive min/max (what cv2.boundingRect returns), via reduceat over
+    the concatenated contour points.
+    """
+    lengths = np.array([len(c) for c in contours])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    points = np.concatenate(contours).reshape(-1, 2).astype(np.float64)
+    x, y = points[:, 0], points[:, 1]
+
+    # Index of each point's successor, wrapping around within its own contour
+    nxt = np.arange(len(points)) + 1
+    nxt[starts + lengths - 1] = starts
+    cross = x * y[nxt] - x[nxt] * y
+    areas = np.abs(np.add.reduceat(cross, starts)) / 2.0
+
+    x1 = np.minimum.reduceat(x, starts)
+    y1 = np.minimum.reduceat(y, starts)
+    w = np.maximum.reduceat(x, starts) - x1 + 1
+    h = np.maximum.reduceat(y, starts) - y1 + 1
+    return areas, x1, y1, w, h
+
+
+def find_plate_candidates(contours, search_regions, width, height, max_contours=100):
+    """
+    Score contours as license plate candidates, best first.
+
+    Cheap features (area, bounding box, aspect ratio, extent, search region
+    containment) are computed for all contours as arrays and filtered in one
+    pass; convex hull and polygon approximation only run on the survivors.
+    """
+    if len(contours) == 0:
+        return []
+
+    areas, xs, ys, ws, hs = _contour_features(contours)
+
+    # Top contours by area (stable, like sorted(..., reverse=True))
+    order = np.argsort(-areas, kind='stable')[:max_contours]
+    areas, xs, ys, ws, hs = areas[order], xs[order], ys[order], ws[order], hs[order]
+
+    # Contour must lie within at least one search region (broadcast over regions)
+    regions = np.asarray(search_regions, dtype=np.float64).reshape(-1, 4)
+    in_region = (
+        (xs[:, None] >= regions[None, :, 0])
+        & (ys[:, None] >= regions[None, :, 1])
+        & (xs[:, None] + ws[:, None] <= regions[None, :, 2])
+        & (ys[:, None] + hs[:, None] <= regions[None, :, 3])
+    ).any(axis=1)
+
+    aspect_ratios = ws / hs
+    extents = areas / (ws * hs)
+
+    # Check if dimensions are reasonable for license plates (minimums scale with image size)
+    min_plate_width, min_plate_height, min_plate_area = plate_size_limits(width, height)
+    max_plate_width = width * 0.95
+    max_plate_height = height * 0.8
+
+    keep = (
+        (areas >= min_plate_area)  # Minimum area for license plate characters
+        & in_region
+        # License plates are typically rectangular
+        # Indian plates: ~3.0-5.0, Motorcycle plates: ~2.0-4.0, Commercial: ~4.0-6.0
+        & (aspect_ratios >= 1.5) & (aspect_ratios <= 7.0)
+        & (ws >= min_plate_width) & (ws <= max_plate_width)
+        & (hs >= min_plate_height) & (hs <= max_plate_height)
+        # Contour should fill reasonable portion of bounding box
+        & (extents >= 0.4)
+    )
+
+    # Expensive shape checks only for contours that passed the cheap ones
+    survivors = []
+    solidities = []
+    for i in np.flatnonzero(keep):
+        contour = contours[order[i]]
+
+        # Calculate solidity (area / convex hull area)
+        hull_area = cv2.contourArea(cv2.convexHull(contour))
+        solidity = areas[i] / hull_area if hull_area > 0 else 0
+        if solidity < 0.5:  # More lenient
+            continue
+
+        # Should be roughly rectangular (4-12 corners)
+        peri = cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, 0.06 * peri, True)  # More lenient approximation
+        if not (4 <= len(approx) <= 12):
+            continue
+
+        survivors.append(i)
+        solidities.append(solidity)
+
+    if not survivors:
+        return []
+
+    idx = np.array(survivors)
+    solidities = np.array(solidities)
+    ar, ext = aspect_ratios[idx], extents[idx]
+
+    # Score based on aspect, size, position (prefer lower part), solidity and extent
+    scores = (
+        np.where((ar >= 2.5) & (ar <= 5.5), 1.0, 0.7)
+        * np.minimum(ws[idx] * hs[idx] / (width * height * 0.1), 1.0)
+        * np.where(ys[idx] > height * 0.15, 1.0, 0.6)
+        * np.minimum(solidities * 2, 1.0)
+        * np.minimum(ext * 2.5, 1.0)
+    )
+
+    candidates = []
+    for j in np.argsort(-scores, kind='stable'):
+        i = idx[j]
+        candidates.append({
+            'contour': contours[order[i]],
+            'bbox': (int(xs[i]), int(ys[i]), int(ws[i]), int(hs[i])),
+            'score': float(scores[j]),
+            'area': float(areas[i]),
+            'aspect_ratio': float(aspect_ratios[i]),
+            'solidity': float(solidities[j]),
+            'extent': float(extents[i]),
+        })
+    return candidates
+
+
 def validate_license_plate_region(plate_img):
     """
     Validate if a cropped region is likely to be a license plate
@@ -295,28 +419,342 @@ def validate_license_plate_region(plate_img):
         return True
 
     except Exception as e:
-        print(f"License plate validation failed: {e}")
+        logger.warning(f"License plate validation failed: {e}")
         return False
 
-def extract_vehicle_number(image):
+# ======================
+# OCR CASCADE
+# ======================
+# Tesseract attempts are (preprocessing variant, PSM) pairs. They are tried in
+# order of historical win rate and the search stops early once a confident
+# full-pattern plate is read, or when the per-image budget is spent.
+OCR_MAX_ATTEMPTS = int(os.environ.get("OCR_MAX_ATTEMPTS", "20"))
+OCR_EARLY_EXIT_CONF = float(os.environ.get("OCR_EARLY_EXIT_CONF", "75"))
+# Optional JSON file the win-rate table is loaded from and saved to
+OCR_STATS_PATH = os.environ.get("OCR_STATS_PATH")
+OCR_STATS_SAVE_EVERY = 20
+
+OCR_VARIANTS = ["otsu", "adaptive", "clahe", "enhanced"]
+PSM_CONFIGS = [
+    '--psm 8 --oem 3',  # Single word
+    '--psm 7 --oem 3',  # Single text line
+    '--psm 13 --oem 3', # Raw line
+    '--psm 6 --oem 3',  # Uniform block of text
+    '--psm 3 --oem 3',  # Fully automatic
+]
+# Default order (original exhaustive loop order) breaks win-rate ties
+DEFAULT_OCR_ATTEMPTS = [(v, p) for v in OCR_VARIANTS for p in PSM_CONFIGS]
+
+FULL_PLATE_PATTERN = re.compile(r'^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$')
+PARTIAL_PLATE_PATTERN = re.compile(r'^[A-Z]{2}\d{2}[A-Z]+\d+$')
+STATE_CODE_PATTERN = re.compile(r'^[A-Z]{2}\d+')
+
+_ocr_stats = {}
+_ocr_stats_lock = threading.Lock()
+_ocr_stats_updates = 0
+
+
+def _load_ocr_stats():
+    if not OCR_STATS_PATH or not os.path.exists(OCR_STATS_PATH):
+        return
+    try:
+        with open(OCR_STATS_PATH) as f:
+            saved = json.load(f)
+        for entry in saved:
+            key = (entry["variant"], entry["psm"])
+            if key in DEFAULT_OCR_ATTEMPTS:
+                _ocr_stats[key] = [int(entry["attempts"]), int(entry["wins"])]
+    except Exception as e:
+        logger.warning(f"Could not load OCR stats from {OCR_STATS_PATH}: {e}")
+
+
+def _save_ocr_stats():
+    if not OCR_STATS_PATH:
+        return
+    try:
+        entries = [
+            {"variant": v, "psm": p, "attempts": a, "wins": w}
+            for (v, p), (a, w) in _ocr_stats.items()
+        ]
+        tmp_path = OCR_STATS_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, OCR_STATS_PATH)
+    except Exception as e:
+        logger.warning(f"Could not save OCR stats to {OCR_STATS_PATH}: {e}")
+
+
+def ocr_attempt_order():
+    """
+    (variant, psm) pairs, best historical win rate first
+    """
+    def win_rate(key):
+        attempts, wins = _ocr_stats.get(key, (0, 0))
+        # Laplace smoothing: untried pairs start at 0.5 so they still get explored
+        return (wins + 1) / (attempts + 2)
+
+    with _ocr_stats_lock:
+        return sorted(
+            DEFAULT_OCR_ATTEMPTS,
+            key=lambda key: (-win_rate(key), DEFAULT_OCR_ATTEMPTS.index(key)),
+        )
+
+
+def ocr_stats():
+    with _ocr_stats_lock:
+        return {f"{v}|{p}": {"attempts": a, "wins": w} for (v, p), (a, w) in _ocr_stats.items()}
+
+
+def _record_ocr_outcome(tried, winner):
+    global _ocr_stats_updates
+    with _ocr_stats_lock:
+        for key in tried:
+            stats = _ocr_stats.setdefault(key, [0, 0])
+            stats[0] += 1
+            if key == winner:
+                stats[1] += 1
+        _ocr_stats_updates += 1
+        if _ocr_stats_updates % OCR_STATS_SAVE_EVERY == 0:
+            _save_ocr_stats()
+
+
+def _ocr_variant_images(enhanced):
+    """
+    Lazily built preprocessing variants of the enhanced grayscale plate image
+    """
+    cache = {}
+
+    def blurred():
+        if "blurred" not in cache:
+            # Apply Gaussian blur to reduce noise
+            cache["blurred"] = cv2.GaussianBlur(np.array(enhanced), (3, 3), 0)
+        return cache["blurred"]
+
+    def otsu():
+        _, binary = cv2.threshold(blurred(), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return Image.fromarray(binary)
+
+    def adaptive():
+        binary = cv2.adaptiveThreshold(blurred(), 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        return Image.fromarray(binary)
+
+    def clahe():
+        # CLAHE for better contrast
+        clahe_op = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
+        clahe_img = clahe_op.apply(blurred().astype(np.uint8))
+        _, binary = cv2.threshold(clahe_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return Image.fromarray(binary)
+
+    builders = {
+        "otsu": otsu,
+        "adaptive": adaptive,
+        "clahe": clahe,
+        "enhanced": lambda: enhanced,  # Original enhanced image
+    }
+
+    def get(variant):
+        if variant not in cache:
+            cache[variant] = builders[variant]()
+        return cache[variant]
+
+    return get
+
+
+def score_plate_text(clean_text, avg_confidence):
+    """
+    Rank an OCR reading: Tesseract confidence plus bonuses for Indian plate patterns
+    """
+    score = avg_confidence
+
+    # Bonus points for matching Indian plate patterns
+    if FULL_PLATE_PATTERN.match(clean_text):  # Full pattern
+        score += 100
+    elif PARTIAL_PLATE_PATTERN.match(clean_text):  # Partial pattern
+        score += 50
+    elif STATE_CODE_PATTERN.match(clean_text):  # State code + numbers
+        score += 25
+
+    # Prefer text with good letter-number balance
+    letters = sum(1 for c in clean_text if c.isalpha())
+    numbers = sum(1 for c in clean_text if c.isdigit())
+    if letters > 0 and numbers > 0:
+        ratio = min(letters, numbers) / max(letters, numbers)
+        if 0.3 <= ratio <= 1.0:  # Balanced alphanumeric
+            score += 20
+
+    return score
+
+
+def _tesseract_read(img, psm_config):
+    """
+    One Tesseract call; returns (clean_text, avg_confidence) or None
+    """
+    # Whitelist for Indian license plates (letters, numbers, no special chars)
+    config = f'{psm_config} -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -c tessedit_pageseg_min_chars=3'
+
+    # Get both text and confidence data from the shared OCR service
+    data = OCR_SERVICE.image_to_data(img, config=config)
+
+    # Extract text from all detected text blocks
+    texts = []
+    confidences = []
+
+    for i, text in enumerate(data['text']):
+        text = text.strip()
+        if text and len(text) >= 3:  # Minimum 3 characters
+            confidence = int(float(data['conf'][i]))
+            if confidence > 30:  # Minimum confidence threshold
+                texts.append(text.upper())
+                confidences.append(confidence)
+
+    if not texts:
+        return None
+
+    # Combine all high-confidence texts and clean them
+    clean_text = re.sub(r'[^A-Z0-9]', '', ''.join(texts))
+    if len(clean_text) < 6:  # Minimum length for Indian plates
+        return None
+    return clean_text, sum(confidences) / len(confidences)
+
+
+def _tesseract_cascade(enhanced, max_attempts=None):
+    """
+    Run Tesseract attempts in learned order until a confident full-pattern
+    match is found or the budget is spent.
+    Returns (best_text, best_score, best_confidence).
+    """
+    budget = OCR_MAX_ATTEMPTS if max_attempts is None else max_attempts
+    variant_image = _ocr_variant_images(enhanced)
+
+    best_text = ""
+    best_score = 0
+    best_confidence = 0.0
+    winner = None
+    tried = []
+
+    for variant, psm_config in ocr_attempt_order()[:max(0, budget)]:
+        tried.append((variant, psm_config))
+        OCR_ATTEMPTS.inc(engine=OCR_SERVICE.engine, variant=variant)
+        try:
+            with span("ocr_attempt"):
+                reading = _tesseract_read(variant_image(variant), psm_config)
+        except Exception:
+            continue
+        if reading is None:
+            continue
+
+        clean_text, avg_confidence = reading
+        score = score_plate_text(clean_text, avg_confidence)
+        if score > best_score:
+            best_score = score
+            best_confidence = avg_confidence
+            best_text = clean_text
+            winner = (variant, psm_config)
+            logger.debug(f"New best: '{clean_text}' (confidence: {avg_confidence:.1f}, score: {score:.1f}, {variant} {psm_config})")
+
+        # Early exit: a full plate read with high confidence won't be beaten in practice
+        if FULL_PLATE_PATTERN.match(clean_text) and avg_confidence >= OCR_EARLY_EXIT_CONF:
+            break
+
+    if tried:
+        OCR_ATTEMPTS_PER_PLATE.observe(len(tried))
+        _record_ocr_outcome(tried, winner)
+    return best_text, best_score, best_confidence
+
+
+_load_ocr_stats()
+
+
+# ======================
+# PLATE OCR CACHE
+# ======================
+# Near-identical plates (consecutive camera frames, retries) are served from a
+# perceptual-hash LRU cache instead of running OCR again. The key is the hash of
+# the localized plate crop OCR reads, so the plate's characters dominate it;
+# whole-input reads (no plate localized) are not cached, and neither are failed
+# reads. PLATE_CACHE_SIZE=0 disables it.
+# PLATE_CACHE_MAX_DISTANCE stays small: plates one character apart
+# (MH28DY2366 / MH20DY2366) can hash only ~6 bits apart.
+PLATE_CACHE = PerceptualCache(
+    max_entries=int(os.environ.get("PLATE_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("PLATE_CACHE_TTL", "600")),
+    max_distance=int(os.environ.get("PLATE_CACHE_MAX_DISTANCE", "2")),
+)
+
+
+def plate_cache_stats():
+    return PLATE_CACHE.stats()
+
+
+def _to_gray(image):
+    """
+    Grayscale ndarray of an OCR input (reusing the shared frame's gray view when available)
+    """
+    if isinstance(image, FrameContext):
+        return image.gray
+    if isinstance(image, Image.Image):
+        return np.array(image.convert('L'))
+    if len(image.shape) == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def extract_vehicle_number(image, max_attempts=None, vehicle_regions=None):
     """
     Extract vehicle number from license plate using OCR - Simplified and optimized for Indian plates
+    max_attempts: Tesseract calls allowed for this image (defaults to OCR_MAX_ATTEMPTS)
+    vehicle_regions: vehicle boxes in this image to search for the plate (default: the whole image)
     """
-    global OCR_ENGINE, PYTESSERACT, EASYOCR_READER
+    return extract_vehicle_number_with_confidence(image, max_attempts=max_attempts,
+                                                  vehicle_regions=vehicle_regions)[0]
 
+
+def extract_vehicle_number_with_confidence(image, max_attempts=None, vehicle_regions=None):
+    """
+    extract_vehicle_number that also returns the OCR confidence (0-100) of the reading.
+
+    The plate is localized first and OCR reads the plate crop, which is also
+    what the cache is keyed on; when no plate is found or the crop can't be
+    read, the whole input is read instead (and not cached).
+    """
+    plate = detect_license_plate(image, vehicle_regions=vehicle_regions or [])
+    cache_key = None
+    result = None
+    if plate is not None:
+        plate_gray = np.array(plate.convert('L'))
+        if PLATE_CACHE.enabled:
+            cache_key = phash(plate_gray)
+            cached = PLATE_CACHE.get(cache_key)
+            if cached is not None:
+                OCR_RESULTS.inc(outcome="cached")
+                return cached
+        result = _read_plate(plate_gray, max_attempts)
+        if result[0] == "DETECT_FAILED":
+            logger.debug("Localized plate unreadable, reading the whole image")
+            result = None
+        elif cache_key is not None:
+            PLATE_CACHE.put(cache_key, result)
+
+    if result is None:
+        # Whole input: not cached, its hash is dominated by everything around the plate
+        result = _read_plate(_to_gray(image), max_attempts)
+
+    OCR_RESULTS.inc(outcome="failed" if result[0] == "DETECT_FAILED" else "read")
+    return result
+
+
+def _read_plate(gray_np, max_attempts=None):
+    """
+    (vehicle number, confidence) read from a grayscale image: the Tesseract
+    cascade first, easyocr as fallback; ("DETECT_FAILED", 0.0) when neither reads a plate
+    """
     vehicle_number = "Unknown"
+    confidence = 0.0
 
-    # Try pytesseract first with optimized settings for Indian license plates
-    if PYTESSERACT is not None:
+    # Try Tesseract first with optimized settings for Indian license plates
+    if OCR_SERVICE is not None:
         try:
-            # Convert to PIL Image if needed
-            if isinstance(image, np.ndarray):
-                ocr_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            else:
-                ocr_image = image
-
-            # Convert to grayscale
-            gray = ocr_image.convert('L')
+            gray = Image.fromarray(gray_np)
 
             # Enhance contrast
             from PIL import ImageEnhance
@@ -330,134 +768,35 @@ def extract_vehicle_number(image):
                 new_size = (int(width * ratio), int(height * ratio))
                 enhanced = enhanced.resize(new_size, Image.Resampling.LANCZOS)
 
-            # Convert to OpenCV for additional processing
-            img_np = np.array(enhanced)
-
-            # Apply Gaussian blur to reduce noise
-            blurred = cv2.GaussianBlur(img_np, (3, 3), 0)
-
-            # Try multiple threshold methods
-            _, binary_otsu = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            binary_adaptive = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-
-            # Try CLAHE for better contrast
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-            clahe_img = clahe.apply(blurred.astype(np.uint8))
-            _, clahe_binary = cv2.threshold(clahe_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-            # Test images
-            test_images = [
-                Image.fromarray(binary_otsu),
-                Image.fromarray(binary_adaptive),
-                Image.fromarray(clahe_binary),
-                enhanced  # Original enhanced image
-            ]
-
-            best_text = ""
-            best_confidence = 0
-
-            # Try different PSM modes optimized for license plates
-            psm_configs = [
-                '--psm 8 --oem 3',  # Single word
-                '--psm 7 --oem 3',  # Single text line
-                '--psm 13 --oem 3', # Raw line
-                '--psm 6 --oem 3',  # Uniform block of text
-                '--psm 3 --oem 3',  # Fully automatic
-            ]
-
-            for img in test_images:
-                for psm_config in psm_configs:
-                    try:
-                        # Whitelist for Indian license plates (letters, numbers, no special chars)
-                        config = f'{psm_config} -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -c tessedit_pageseg_min_chars=3'
-
-                        # Get both text and confidence data
-                        data = PYTESSERACT.image_to_data(img, config=config, output_type=PYTESSERACT.Output.DICT)
-
-                        # Extract text from all detected text blocks
-                        texts = []
-                        confidences = []
-
-                        for i, text in enumerate(data['text']):
-                            text = text.strip()
-                            if text and len(text) >= 3:  # Minimum 3 characters
-                                confidence = int(data['conf'][i])
-                                if confidence > 30:  # Minimum confidence threshold
-                                    texts.append(text.upper())
-                                    confidences.append(confidence)
-
-                        if texts:
-                            # Combine all high-confidence texts
-                            combined_text = ''.join(texts)
-
-                            # Clean the text
-                            import re
-                            clean_text = re.sub(r'[^A-Z0-9]', '', combined_text)
-
-                            if len(clean_text) >= 6:  # Minimum length for Indian plates
-                                # Calculate average confidence
-                                avg_confidence = sum(confidences) / len(confidences)
-
-                                # Score based on Indian license plate pattern
-                                score = avg_confidence
-
-                                # Bonus points for matching Indian plate patterns
-                                if re.match(r'^[A-Z]{2}\d{2}[A-Z]{1,2}\d{4}$', clean_text):  # Full pattern
-                                    score += 100
-                                elif re.match(r'^[A-Z]{2}\d{2}[A-Z]+\d+$', clean_text):  # Partial pattern
-                                    score += 50
-                                elif re.match(r'^[A-Z]{2}\d+', clean_text):  # State code + numbers
-                                    score += 25
-
-                                # Prefer text with good letter-number balance
-                                letters = sum(1 for c in clean_text if c.isalpha())
-                                numbers = sum(1 for c in clean_text if c.isdigit())
-                                if letters > 0 and numbers > 0:
-                                    ratio = min(letters, numbers) / max(letters, numbers)
-                                    if 0.3 <= ratio <= 1.0:  # Balanced alphanumeric
-                                        score += 20
-
-                                if score > best_confidence:
-                                    best_confidence = score
-                                    best_text = clean_text
-                                    print(f"New best: '{clean_text}' (confidence: {avg_confidence:.1f}, score: {score:.1f})")
-
-                    except Exception as e:
-                        continue
+            best_text, best_score, best_confidence = _tesseract_cascade(enhanced, max_attempts=max_attempts)
 
             if best_text and len(best_text) >= 6:
                 vehicle_number = best_text
-                print(f"Final extracted vehicle number: '{vehicle_number}'")
+                confidence = best_confidence
+                logger.debug(f"Final extracted vehicle number: '{vehicle_number}'")
             else:
-                print("No valid license plate text found with pytesseract")
+                logger.debug(f"No valid license plate text found with {OCR_SERVICE.engine}")
 
         except Exception as e:
-            print(f"pytesseract OCR failed: {e}")
+            logger.warning(f"{OCR_SERVICE.engine} OCR failed: {e}")
 
-    # Fallback to easyocr if pytesseract didn't work
+    # Fallback to easyocr if Tesseract didn't work
     if vehicle_number == "Unknown" and EASYOCR_READER is not None:
         try:
-            print("Trying easyocr as fallback...")
-
-            # Prepare image for easyocr
-            if isinstance(image, Image.Image):
-                ocr_img = np.array(image.convert('L'))
-            else:
-                ocr_img = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+            logger.debug("Trying easyocr as fallback...")
 
             # Use easyocr with optimized settings
-            results = EASYOCR_READER.readtext(ocr_img, allowlist='ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', detail=1)
+            results = EASYOCR_READER.readtext(gray_np, allowlist='ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', detail=1)
 
             # Filter results by confidence and length
             valid_results = []
-            for (bbox, text, confidence) in results:
+            for (bbox, text, conf) in results:
                 text = text.strip().upper()
-                if confidence > 0.3 and len(text) >= 6:  # Minimum confidence and length
+                if conf > 0.3 and len(text) >= 6:  # Minimum confidence and length
                     # Clean text
-                    import re
                     clean_text = re.sub(r'[^A-Z0-9]', '', text)
                     if len(clean_text) >= 6:
-                        valid_results.append((clean_text, confidence))
+                        valid_results.append((clean_text, conf))
 
             if valid_results:
                 # Sort by confidence and pick the best
@@ -465,19 +804,19 @@ def extract_vehicle_number(image):
                 best_text, best_conf = valid_results[0]
 
                 # Additional validation for Indian plates
-                import re
-                if re.match(r'^[A-Z]{2}\d{2}[A-Z]+\d+$', best_text):
+                if PARTIAL_PLATE_PATTERN.match(best_text):
                     vehicle_number = best_text
-                    print(f"easyocr extracted: '{vehicle_number}' (confidence: {best_conf:.2f})")
+                    confidence = float(best_conf) * 100
+                    logger.debug(f"easyocr extracted: '{vehicle_number}' (confidence: {best_conf:.2f})")
                 else:
-                    print(f"easyocr result doesn't match Indian plate pattern: '{best_text}'")
+                    logger.debug(f"easyocr result doesn't match Indian plate pattern: '{best_text}'")
 
         except Exception as e:
-            print(f"easyocr failed: {e}")
+            logger.warning(f"easyocr failed: {e}")
 
     if vehicle_number == "Unknown":
-        print("License plate detection failed - no valid text extracted")
+        logger.debug("License plate detection failed - no valid text extracted")
         # Return a placeholder that indicates detection failed
         vehicle_number = "DETECT_FAILED"
 
-    return vehicle_number
+    return vehicle_number, confidence
@@ -0,0 +1,236 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+from detector.inference_engine import fork_safe, load_model
+from utils.frame import FrameContext
+from utils.metrics import MICRO_BATCH_REQUESTS, MODEL_FRAMES, MODEL_INFERENCES, MODEL_SECONDS
+from utils.micro_batch import MicroBatcher
+from utils.startup import timed
+
+logger = logging.getLogger(__name__)
+
+# Process-wide registry: every YOLO weight file is loaded once and shared by all detectors
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+GENERAL_MODEL_FILE = "yolov8n.pt"
+MODEL_FILES = {
+    "vehicle": GENERAL_MODEL_FILE,
+    "helmet": "yolo_helmet.pt",
+    "seatbelt": "yolo_seatbelt.pt",
+}
+
+# ultralytics' own default; every caller shares it so one pass per frame can be reused
+DEFAULT_CONF = 0.25
+# Largest list of frames handed to a model in one forward pass
+MAX_BATCH_SIZE = int(os.environ.get("MODEL_BATCH_SIZE", "16"))
+# Micro-batching across concurrent requests: while requests overlap, the first frame queued
+# for a model waits up to MICRO_BATCH_WAIT_MS for frames from other request threads, up to
+# MICRO_BATCH_SIZE frames per forward pass; a lone request never waits
+# (MICRO_BATCH_WAIT_MS=0 disables it; every request runs its own pass)
+MICRO_BATCH_WAIT_MS = float(os.environ.get("MICRO_BATCH_WAIT_MS", "5"))
+MICRO_BATCH_SIZE = int(os.environ.get("MICRO_BATCH_SIZE", str(MAX_BATCH_SIZE)))
+
+# Precision each model is served at: MODEL_PRECISION for all of them, overridden
+# per model by MODEL_PRECISION_<NAME> (e.g. MODEL_PRECISION_HELMET=int8)
+MODEL_PRECISION = os.environ.get("MODEL_PRECISION", "fp32").lower()
+
+_models = {}
+_model_paths = {}
+_model_precisions = {}
+_batchers = {}
+_load_errors = {}
+_lock = threading.Lock()
+
+
+def resolve_model_path(name):
+    """
+    Path of the weights for a named model, falling back to the general yolov8n
+    model when the dedicated weights are missing or empty
+    """
+    path = os.path.join(MODELS_DIR, MODEL_FILES[name])
+    if not os.path.exists(path) or os.path.getsize(path) < 1024:
+        path = os.path.join(MODELS_DIR, GENERAL_MODEL_FILE)
+    return path
+
+
+def get_model(name):
+    """
+    Return the loaded YOLO model for name, loading it on first use.
+    Models that resolve to the same weights file share one instance.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(name)
+        if model is not None:
+            return model
+
+        path = resolve_model_path(name)
+        precision = model_precision(name)
+        model = _load(path, precision)
+        if model is None and not path.endswith(GENERAL_MODEL_FILE):
+            # Final fallback: attempt to load the shipped yolov8n
+            path = os.path.join(MODELS_DIR, GENERAL_MODEL_FILE)
+            model = _load(path, precision)
+        if model is None:
+            cause = _load_errors.get(path)
+            raise RuntimeError(f"Could not load model '{name}'" + (f": {cause}" if cause else ""))
+
+        _models[name] = model
+        _model_paths[name] = path
+        _model_precisions[name] = precision
+        return model
+
+
+def model_precision(name):
+    return os.environ.get(f"MODEL_PRECISION_{name.upper()}", MODEL_PRECISION).lower()
+
+
+def _load(path, precision="fp32"):
+    # Reuse an instance already loaded from the same file (at the same precision) under another name
+    for other, other_path in _model_paths.items():
+        if other_path == path and _model_precisions[other] == precision:
+            return _models[other]
+    try:
+        logger.info(f"Loading model from {path} ({precision})")
+        model = load_model(path, precision=precision)
+    except Exception as e:
+        logger.error(f"Failed to load model at {path}: {e}")
+        _load_errors[path] = str(e)
+        return None
+    _load_errors.pop(path, None)
+    return model
+
+
+def model_path(name):
+    get_model(name)
+    return _model_paths[name]
+
+
+def model_key(name):
+    """
+    Identity of the model instance serving name: (weights path, precision actually loaded)
+    """
+    model = get_model(name)
+    return _model_paths[name], getattr(model, "precision", "fp32")
+
+
+def is_general_model(name):
+    """
+    True when name is served by the general yolov8n model rather than dedicated weights
+    """
+    return model_path(name).endswith(GENERAL_MODEL_FILE)
+
+
+def predict(name, image, conf=DEFAULT_CONF):
+    """
+    Run the named model on a frame and return the ultralytics results.
+
+    Results are memoized on the FrameContext keyed by model instance, so stages
+    that share a model (vehicle typing, plate search regions, general-model
+    helmet/seatbelt fallbacks) reuse one inference per frame.
+    """
+    frame = FrameContext.from_any(image)
+    model = get_model(name)
+    key = ("yolo",) + model_key(name) + (conf,)
+    # ultralytics expects BGR arrays, like cv2.imread output
+    return frame.cached(key, lambda: _forward(name, model, [frame.bgr], conf))
+
+
+def predict_batch(name, images, conf=DEFAULT_CONF):
+    """
+    Run the named model over many frames in as few forward passes as possible.
+
+    Frames that already have a memoized result for this model are skipped; the
+    rest go through the model in chunks of MAX_BATCH_SIZE (or the model's own
+    limit, see batch_limit) and each frame's result is memoized so later
+    predict() calls on it are free.
+    Returns one results list per input frame, like predict().
+    """
+    frames = [FrameContext.from_any(image) for image in images]
+    model = get_model(name)
+    key = ("yolo",) + model_key(name) + (conf,)
+
+    pending = [f for f in frames if not f.has(key)]
+    size = batch_limit(model)
+    for start in range(0, len(pending), size):
+        chunk = pending[start:start + size]
+        results = _forward(name, model, [f.bgr for f in chunk], conf)
+        for frame, result in zip(chunk, results):
+            frame.cached(key, lambda result=result: [result])
+
+    return [predict(name, f, conf=conf) for f in frames]
+
+
+def batch_limit(model, size=MAX_BATCH_SIZE):
+    """
+    Frames one forward pass may take: size, capped by the model's own limit
+    (exports with a static batch size take one frame at a time)
+    """
+    return min(size, getattr(model, "max_batch", None) or size)
+
+
+def _forward(name, model, images, conf):
+    """
+    Forward pass over a list of frames. With micro-batching on, small lists are
+    queued and run together with frames from other request threads that use
+    the same model instance.
+    """
+    max_batch = batch_limit(model, MICRO_BATCH_SIZE)
+    if MICRO_BATCH_WAIT_MS <= 0 or len(images) >= max_batch:
+        return _infer(name, model, images, conf)
+    key = model_key(name) + (conf,)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        with _lock:
+            batcher = _batchers.get(key)
+            if batcher is None:
+                labels = {"model": os.path.basename(key[0])}
+                batcher = _batchers[key] = MicroBatcher(
+                    lambda frames: _infer(name, model, frames, conf),
+                    max_batch=max_batch,
+                    max_wait=MICRO_BATCH_WAIT_MS / 1000.0,
+                    name=f"micro-batch-{name}",
+                    on_batch=lambda requests, frames: MICRO_BATCH_REQUESTS.observe(requests, **labels),
+                )
+    return batcher.submit(images)
+
+
+def _infer(name, model, source, conf):
+    """
+    One forward pass (a frame or a list of frames), counted in the model metrics
+    """
+    labels = {"model": os.path.basename(_model_paths[name]), "precision": getattr(model, "precision", "fp32")}
+    MODEL_INFERENCES.inc(**labels)
+    MODEL_FRAMES.inc(len(source) if isinstance(source, list) else 1, **labels)
+    with MODEL_SECONDS.time(**labels):
+        return model(source, conf=conf, verbose=False)
+
+
+def preload(names=None, warmup=False, imgsz=640, before_fork=False):
+    """
+    Load the named models (all by default) and optionally run one dummy
+    inference through each so the first real request doesn't pay for setup.
+    before_fork loads only the models that are safe to share with forked
+    workers (see inference_engine.fork_safe); each worker loads the rest.
+    """
+    names = list(names or MODEL_FILES)
+    if before_fork:
+        deferred = [name for name in names if not fork_safe(model_precision(name))]
+        if deferred:
+            logger.info(f"Loading {', '.join(deferred)} in each worker after fork (not fork-safe)")
+        names = [name for name in names if name not in deferred]
+    warmed = set()
+    for name in names:
+        model = get_model(name)
+        if warmup and id(model) not in warmed:
+            with timed("warmup", os.path.basename(model_path(name))):
+                model(np.zeros((imgsz, imgsz, 3), dtype=np.uint8), verbose=False)
+            warmed.add(id(model))
+    return names
@@ -0,0 +1,185 @@
+import logging
+import os
+import queue
+import re
+import threading
+
+from utils.startup import timed
+
+logger = logging.getLogger(__name__)
+
+# tesserocr binds libtesseract in-process; it is optional and we fall back to
+# pytesseract (one tesseract subprocess + temp files per call) without it
+try:
+    import tesserocr
+except Exception:
+    tesserocr = None
+
+# tesseract executable pytesseract spawns (default: the Windows installer's path on Windows, else PATH)
+TESSERACT_CMD = os.environ.get(
+    "TESSERACT_CMD", r'C:\Program Files\Tesseract-OCR\tesseract.exe' if os.name == "nt" else "")
+# Resident Tesseract instances kept by the pool (one call in flight per instance)
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+TESSDATA_PREFIX = os.environ.get("TESSDATA_PREFIX")
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+
+PSM_PATTERN = re.compile(r'--psm\s+(\d+)')
+VARIABLE_PATTERN = re.compile(r'-c\s+([A-Za-z_]+)=(\S+)')
+
+
+def parse_config(config):
+    """
+    Split a pytesseract-style config string into (psm, {variable: value})
+    """
+    match = PSM_PATTERN.search(config or "")
+    psm = int(match.group(1)) if match else 3
+    return psm, dict(VARIABLE_PATTERN.findall(config or ""))
+
+
+class PytesseractService:
+    """
+    Per-call pytesseract backend (spawns the tesseract executable for every call)
+    """
+
+    engine = "pytesseract"
+
+    def __init__(self, pytesseract):
+        self.pytesseract = pytesseract
+
+    def image_to_data(self, image, config=""):
+        data = self.pytesseract.image_to_data(image, config=config, output_type=self.pytesseract.Output.DICT)
+        return {"text": list(data["text"]), "conf": list(data["conf"])}
+
+    def close(self):
+        pass
+
+
+class TesserocrPool:
+    """
+    Pool of long-lived in-process Tesseract instances.
+
+    Each instance is initialised once (language data loaded once) and reused
+    for every call; images are handed over in memory, so there is no process
+    spawn or temp-file I/O per call. tesserocr releases the GIL while
+    recognising, so calls from several request threads run in parallel.
+    """
+
+    engine = "tesserocr"
+
+    def __init__(self, size=OCR_WORKERS, lang=OCR_LANG, path=TESSDATA_PREFIX):
+        self.size = max(1, size)
+        self.lang = lang
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # Create one instance up front so a missing install fails here, not per request
+        self._idle.put(self._create())
+
+    def _create(self):
+        kwargs = {"lang": self.lang}
+        if self.path:
+            kwargs["path"] = self.path
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        self._created += 1
+        return api
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                return self._create()
+        return self._idle.get()
+
+    def image_to_data(self, image, config=""):
+        psm, variables = parse_config(config)
+        api = self._acquire()
+        try:
+            api.SetPageSegMode(psm)
+            for name, value in variables.items():
+                api.SetVariable(name, value)
+            api.SetImage(image)
+            api.Recognize()
+
+            texts, confs = [], []
+            iterator = api.GetIterator()
+            level = tesserocr.RIL.WORD
+            for word in tesserocr.iterate_level(iterator, level):
+                text = word.GetUTF8Text(level)
+                if text is None:
+                    continue
+                texts.append(text)
+                confs.append(word.Confidence(level))
+            return {"text": texts, "conf": confs}
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().End()
+            except queue.Empty:
+                break
+
+
+def create_resident_ocr_service(workers=OCR_WORKERS):
+    """
+    TesserocrPool when tesserocr and its language data are available, else None
+    """
+    if tesserocr is None:
+        logger.warning("tesserocr is not installed: OCR falls back to pytesseract, "
+                       "which spawns a tesseract process per call (pip install tesserocr)")
+        return None
+    try:
+        pool = TesserocrPool(size=workers)
+        logger.info(f"OCR service: {workers} resident tesserocr workers")
+        return pool
+    except Exception as e:
+        logger.warning(f"tesserocr failed to initialise, falling back to a tesseract subprocess per call: {e}")
+        return None
+
+
+def setup_ocr():
+    """
+    Pick and load the OCR backend: resident in-process Tesseract workers
+    (tesserocr), then pytesseract, then easyocr. Installs it in the plate
+    detector and returns (engine, pytesseract, easyocr_reader, service);
+    engine is None when no backend could be loaded.
+    """
+    # Imported here: the plate detector itself imports this module
+    from detector.license_plate_detector import set_ocr_globals
+
+    engine, pytesseract, easyocr_reader = None, None, None
+    with timed("ocr", "tesserocr"):
+        service = create_resident_ocr_service()
+    if service is not None:
+        engine = service.engine
+    else:
+        try:
+            with timed("import", "pytesseract"):
+                import pytesseract
+            if TESSERACT_CMD:
+                pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+            engine = 'pytesseract'
+        except Exception as e:
+            logger.warning(f"pytesseract failed to load: {e}")
+            pytesseract = None
+            try:
+                with timed("import", "easyocr"):
+                    import easyocr
+                # Create reader once (may be slow)
+                with timed("ocr", "easyocr.Reader"):
+                    easyocr_reader = easyocr.Reader(['en'], gpu=False)
+                engine = 'easyocr'
+            except Exception as e:
+                logger.warning(f"easyocr failed to load: {e}")
+                easyocr_reader = None
+
+    if engine is None:
+        logger.warning("No OCR backend available: plates will be reported as DETECT_FAILED")
+    set_ocr_globals(engine, pytesseract, easyocr_reader, service)
+    return engine, pytesseract, easyocr_reader, service
@@ -0,0 +1,107 @@
+import logging
+import os
+
+import cv2
+import numpy as np
+
+from detector.inference_engine import INFERENCE_IMGSZ
+
+logger = logging.getLogger(__name__)
+
+QUANT_MODES = ("static", "dynamic")
+
+
+def letterbox(image, imgsz=INFERENCE_IMGSZ):
+    """
+    BGR image -> 1x3xHxW float32 RGB tensor, resized and padded the way
+    ultralytics feeds its exported models
+    """
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+class ImageCalibrationReader:
+    """
+    onnxruntime CalibrationDataReader over a list of BGR images
+    """
+
+    def __init__(self, input_name, images, imgsz=INFERENCE_IMGSZ):
+        self.input_name = input_name
+        self.images = images
+        self.imgsz = imgsz
+        self._index = 0
+
+    def get_next(self):
+        if self._index >= len(self.images):
+            return None
+        image = self.images[self._index]
+        self._index += 1
+        return {self.input_name: letterbox(image, self.imgsz)}
+
+    def rewind(self):
+        self._index = 0
+
+
+def quantize_onnx(fp32_path, output_path, mode="static", calibration_images=None, imgsz=INFERENCE_IMGSZ):
+    """
+    Write an INT8 copy of an exported FP32 ONNX model.
+
+    static: weights and activations in INT8 (QDQ format), activation ranges
+    calibrated on calibration_images. dynamic: INT8 weights, activation scales
+    computed per inference; needs no calibration data but gains less on convs.
+    The ultralytics metadata (class names, stride, imgsz) is carried over so
+    the quantized file loads like any exported model.
+    """
+    import onnx
+    import onnxruntime
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Unknown quantization mode '{mode}'")
+    if mode == "static" and not calibration_images:
+        raise ValueError("Static quantization needs calibration images")
+
+    # Shape inference and graph folding first, as ONNX Runtime recommends
+    source_path = output_path + ".prep.onnx"
+    try:
+        quant_pre_process(fp32_path, source_path, skip_symbolic_shape=True)
+    except Exception as e:
+        logger.warning(f"Quantization pre-processing skipped: {e}")
+        source_path = fp32_path
+
+    try:
+        if mode == "dynamic":
+            quantize_dynamic(source_path, output_path, weight_type=QuantType.QInt8)
+        else:
+            session = onnxruntime.InferenceSession(source_path, providers=["CPUExecutionProvider"])
+            reader = ImageCalibrationReader(session.get_inputs()[0].name, calibration_images, imgsz)
+            quantize_static(
+                source_path,
+                output_path,
+                reader,
+                quant_format=QuantFormat.QDQ,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+                per_channel=True,
+            )
+    finally:
+        if source_path != fp32_path and os.path.exists(source_path):
+            os.remove(source_path)
+
+    source = onnx.load(fp32_path, load_external_data=False)
+    quantized = onnx.load(output_path)
+    existing = {p.key for p in quantized.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            quantized.metadata_props.add(key=prop.key, value=prop.value)
+    quantized.metadata_props.add(key="quantization", value=mode)
+    onnx.save(quantized, output_path)
+    return output_path
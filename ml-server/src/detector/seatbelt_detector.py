@@ -1,25 +1,17 @@
-import os
-from ultralytics import YOLO
-from utils.preprocess import load_image
+import logging
 
-# Load model once at import to avoid reloading on each request
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "..", "models", "yolo_seatbelt.pt")
-# If the dedicated seatbelt model is missing or empty, fall back to the general yolov8n model
-if not os.path.exists(MODEL_PATH) or os.path.getsize(MODEL_PATH) < 1024:
-    MODEL_PATH = os.path.join(BASE_DIR, "..", "models", "yolov8n.pt")
-try:
-    model = YOLO(MODEL_PATH)
-except Exception as e:
-    print(f"Failed to load seatbelt model at {MODEL_PATH}: {e}")
-    model = YOLO(os.path.join(BASE_DIR, "..", "models", "yolov8n.pt"))
+from detector.model_registry import get_model, is_general_model, predict, predict_batch
+from utils.frame import FrameContext
+
+logger = logging.getLogger(__name__)
 
-is_general_model = MODEL_PATH.endswith('yolov8n.pt')
 
 def detect_seatbelt(image_file):
     try:
-        img = load_image(image_file)
-        results = model(img)
+        frame = FrameContext.from_any(image_file)
+        model = get_model("seatbelt")
+        general_model = is_general_model("seatbelt")
+        results = predict("seatbelt", frame)
         boxes = []
         detected_classes = []
 
@@ -40,7 +32,7 @@ def detect_seatbelt(image_file):
                     detected_classes.append(cls_name)
 
                 # If using dedicated seatbelt model, look for seatbelt/belt classes
-                if not is_general_model and cls_name and ('seatbelt' in cls_name or 'belt' in cls_name):
+                if not general_model and cls_name and ('seatbelt' in cls_name or 'belt' in cls_name):
                     boxes.append({
                         'x1': int(box.xyxy[0][0]),
                         'y1': int(box.xyxy[0][1]),
@@ -58,18 +50,18 @@ def detect_seatbelt(image_file):
                 max_conf = b['confidence']
 
         # If using general model (yolov8n), implement fallback logic
-        if is_general_model:
+        if general_model:
             # Check if car is detected
             has_car = 'car' in detected_classes or 'truck' in detected_classes or 'bus' in detected_classes
 
             if has_car:
                 # For cars, we cannot reliably detect seatbelt with general model
                 # Return False (no seatbelt detected) with low confidence to indicate uncertainty
-                print(f"Seatbelt detector (general model) saw classes: {detected_classes}, assuming no seatbelt detectable")
+                logger.debug(f"Seatbelt detector (general model) saw classes: {detected_classes}, assuming no seatbelt detectable")
                 return False, [], 0.1  # Low confidence to indicate fallback logic
             else:
                 # No car detected, assume not applicable
-                print(f"Seatbelt detector (general model) saw classes: {detected_classes}, no car detected")
+                logger.debug(f"Seatbelt detector (general model) saw classes: {detected_classes}, no car detected")
                 return True, [], 0.0  # Not applicable, but return True to avoid false violations
 
         # For dedicated seatbelt model
@@ -78,10 +70,31 @@ def detect_seatbelt(image_file):
 
         # Debug: print detected classes if no seatbelt found or low confidence
         if not boxes or max_conf < CONF_THRESHOLD:
-            print(f"Seatbelt detector saw classes: {detected_classes}, max_conf={max_conf}")
+            logger.debug(f"Seatbelt detector saw classes: {detected_classes}, max_conf={max_conf}")
 
         # Final return: seatbelt presence (bool), boxes list, max confidence
         return seatbelt_present, boxes, max_conf
     except Exception as e:
-        print(f"Error in seatbelt detection: {e}")
-        return False, [], 0.0
+        logger.warning(f"Error in seatbelt detection: {e}")
+        # Never report a failed check as "no seatbelt": that would be a false violation
+        raise
+
+
+def detect_seatbelt_batch(images):
+    """
+    detect_seatbelt for many frames: the seatbelt model runs over all of them in
+    batched forward passes, then each frame's verdict is read from its results.
+    A frame whose check failed gets the exception in place of its verdict.
+    """
+    frames = [FrameContext.from_any(image) for image in images]
+    try:
+        predict_batch("seatbelt", frames)
+    except Exception as e:
+        logger.warning(f"Batched seatbelt inference failed, falling back to per-frame: {e}")
+    results = []
+    for frame in frames:
+        try:
+            results.append(detect_seatbelt(frame))
+        except Exception as e:
+            results.append(e)
+    return results
@@ -1,34 +1,72 @@
-from ultralytics import YOLO
-from utils.preprocess import load_image
-import os
+import logging
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-MODEL_PATH = os.path.join(BASE_DIR, "models", "yolov8n.pt")
+from detector.model_registry import get_model, predict, predict_batch
+from utils.frame import FrameContext
 
-model = YOLO(MODEL_PATH)
+logger = logging.getLogger(__name__)
 
-def classify_vehicle(image_file):
-    try:
-        img = load_image(image_file)
-        results = model(img)
-        for r in results:
-            for box in r.boxes:
+CAR_CLASSES = ["car", "bus", "truck"]
+BIKE_CLASSES = ["motorcycle", "bicycle"]
+
+
+def detect_vehicles(image_file):
+    """
+    Vehicle boxes from a single yolov8n pass, memoized on the frame so vehicle
+    typing and license plate search regions share the same detections
+    """
+    frame = FrameContext.from_any(image_file)
+    return frame.cached("vehicles", lambda: _detect_vehicles(frame))
+
+
+def _detect_vehicles(frame):
+    model = get_model("vehicle")
+    results = predict("vehicle", frame)
+    vehicles = []
+    for r in results:
+        for box in r.boxes:
+            try:
+                cls_idx = int(box.cls[0]) if hasattr(box.cls, '__len__') else int(box.cls)
+            except Exception:
                 try:
-                    cls_idx = int(box.cls[0]) if hasattr(box.cls, '__len__') else int(box.cls)
+                    cls_idx = int(box.cls)
                 except Exception:
-                    try:
-                        cls_idx = int(box.cls)
-                    except Exception:
-                        cls_idx = None
-
-                if cls_idx is None:
-                    continue
-                name = model.names.get(cls_idx, str(cls_idx)).lower()
-                if name in ["car", "bus", "truck"]:
-                    return "car"
-                if name in ["motorcycle", "bicycle"]:
-                    return "bike"
+                    cls_idx = None
+
+            if cls_idx is None:
+                continue
+            name = model.names.get(cls_idx, str(cls_idx)).lower()
+            if name not in CAR_CLASSES and name not in BIKE_CLASSES:
+                continue
+            vehicles.append({
+                'x1': int(box.xyxy[0][0]),
+                'y1': int(box.xyxy[0][1]),
+                'x2': int(box.xyxy[0][2]),
+                'y2': int(box.xyxy[0][3]),
+                'confidence': float(box.conf[0]),
+                'class': name,
+                'type': "car" if name in CAR_CLASSES else "bike",
+            })
+    return vehicles
+
+
+def classify_vehicle(image_file):
+    try:
+        vehicles = detect_vehicles(image_file)
+        if vehicles:
+            return vehicles[0]['type']
         return "bike"
     except Exception as e:
-        print(f"Vehicle classification error: {e}")
+        logger.warning(f"Vehicle classification error: {e}")
         return "bike"
+
+
+def classify_vehicle_batch(images):
+    """
+    classify_vehicle for many frames with one batched yolov8n pass
+    """
+    frames = [FrameContext.from_any(image) for image in images]
+    try:
+        predict_batch("vehicle", frames)
+    except Exception as e:
+        logger.warning(f"Batched vehicle inference failed, falling back to per-frame: {e}")
+    return [classify_vehicle(frame) for frame in frames]
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+JOBS_DIR = os.environ.get("ML_JOBS_DIR", os.path.join(BASE_DIR, "data", "jobs"))
+# Running jobs whose heartbeat is older than this are assumed orphaned (worker died) and requeued
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "300"))
+# A job that keeps getting orphaned (e.g. crashes its worker) is failed after this many starts
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStore:
+    """
+    Durable job queue in a local SQLite database.
+
+    Each call opens its own connection, so the store can be shared by threads
+    and by the processes forked by serve.py; claiming a job is a single
+    IMMEDIATE transaction, so two workers never take the same one.
+
+    A claim is identified by the job's attempts count at claim time. A run
+    whose job was requeued as stale and claimed again no longer owns it:
+    its heartbeats tell it to stop and its finish() changes nothing.
+    """
+
+    def __init__(self, directory=JOBS_DIR):
+        self.directory = directory
+        self.spool_dir = os.path.join(directory, "spool")
+        self.db_path = os.path.join(directory, "jobs.sqlite3")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with self._db() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    input_path TEXT,
+                    progress REAL NOT NULL DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _db(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def spool_path(self, suffix=""):
+        return os.path.join(self.spool_dir, f"{uuid.uuid4().hex}{suffix}")
+
+    def submit(self, kind, input_path, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._db() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, input_path, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), input_path, now, now),
+            )
+        return job_id
+
+    def get(self, job_id, with_result=False):
+        with self._db() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "params": json.loads(row["params"]),
+            "error": row["error"],
+            "cancel_requested": bool(row["cancel_requested"]),
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if with_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def claim_next(self):
+        """
+        Atomically move the oldest queued job to running and return it (or None).
+        Orphaned running jobs are requeued first so they survive restarts.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            abandoned = [
+                stale["id"] for stale in conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND updated_at < ? AND attempts >= ?",
+                    (RUNNING, now - JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS),
+                )
+            ]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                [(FAILED, "Worker died while running the job", now, now, job_id) for job_id in abandoned],
+            )
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, now, RUNNING, now - JOB_STALE_SECONDS),
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (RUNNING, now, now, row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        # Failed for good, like finish(): their spooled uploads are no longer needed
+        for job_id in abandoned:
+            self._remove_input(job_id)
+        if row is None:
+            return None
+        job = self.get(row["id"])
+        job["input_path"] = self._input_path(row["id"])
+        return job
+
+    def _input_path(self, job_id):
+        with self._db() as conn:
+            row = conn.execute("SELECT input_path FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["input_path"] if row else None
+
+    def heartbeat(self, job_id, progress, attempt):
+        """
+        Record progress (None keeps the last known value) for the claim made at attempt.
+        Returns True if the run should stop: cancellation was requested, or the claim was lost.
+        """
+        with self._db() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET progress = COALESCE(?, progress), updated_at = ?"
+                " WHERE id = ? AND status = ? AND attempts = ?",
+                (progress, time.time(), job_id, RUNNING, attempt),
+            ).rowcount
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return not updated or bool(row and row["cancel_requested"])
+
+    def finish(self, job_id, status, result=None, error=None, attempt=None):
+        """
+        Record the outcome of a run. With attempt, only the run still owning the job
+        (status running, same claim) can finish it. Returns False if nothing was changed.
+        """
+        now = time.time()
+        query = (
+            # Failed/cancelled jobs keep the last progress they reported
+            "UPDATE jobs SET status = ?, result = ?, error = ?,"
+            " progress = CASE WHEN ? THEN 1.0 ELSE progress END,"
+            " finished_at = ?, updated_at = ? WHERE id = ?"
+        )
+        args = [
+            status,
+            json.dumps(result) if result is not None else None,
+            error,
+            status == DONE,
+            now, now, job_id,
+        ]
+        if attempt is not None:
+            query += " AND status = ? AND attempts = ?"
+            args += [RUNNING, attempt]
+        with self._db() as conn:
+            updated = conn.execute(query, args).rowcount
+        if not updated:
+            return False
+        self._remove_input(job_id)
+        return True
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: queued jobs stop immediately, running ones at their next heartbeat.
+        Returns the job's status afterwards, or None if it doesn't exist.
+        """
+        now = time.time()
+        with self._db() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = ?",
+                (CANCELLED, now, now, job_id, QUEUED),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+                (now, job_id, RUNNING),
+            )
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row["status"] == CANCELLED:
+            self._remove_input(job_id)
+        return row["status"]
+
+    def _remove_input(self, job_id):
+        path = self._input_path(job_id)
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class JobWorkerPool:
+    """
+    Threads that drain the JobStore. handlers maps job kind to
+    handler(job, report_progress) -> result; report_progress(fraction)
+    records a heartbeat (fraction may be None when unknown) and raises
+    JobCancelled once the job has been cancelled or claimed by another run.
+    """
+
+    def __init__(self, store, handlers, workers=1):
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(0, workers)
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def start(self):
+        # Threads don't survive fork: (re)start them in whichever process calls this
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        if self.workers:
+            logger.info(f"Started {self.workers} job workers (pid {self._pid})")
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim_next()
+            except Exception as e:
+                logger.error(f"Job queue error: {e}")
+                job = None
+            if job is None:
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._execute(job)
+
+    def _execute(self, job):
+        job_id = job["job_id"]
+        attempt = job["attempts"]
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            self.store.finish(job_id, FAILED, error=f"Unknown job kind '{job['kind']}'", attempt=attempt)
+            return
+
+        def report_progress(fraction):
+            if self.store.heartbeat(job_id, None if fraction is None else float(fraction), attempt):
+                raise JobCancelled()
+
+        logger.info(f"Job {job_id} ({job['kind']}) started", extra={"job_id": job_id})
+        try:
+            result = handler(job, report_progress)
+        except JobCancelled:
+            status, result, error = CANCELLED, None, None
+        except Exception as e:
+            status, result, error = FAILED, None, str(e)
+        else:
+            status, error = DONE, None
+
+        if not self.store.finish(job_id, status, result=result, error=error, attempt=attempt):
+            logger.warning(f"Job {job_id} was taken over by another run; dropping this run's outcome",
+                           extra={"job_id": job_id})
+        elif status == CANCELLED:
+            logger.info(f"Job {job_id} cancelled", extra={"job_id": job_id})
+        elif status == FAILED:
+            logger.error(f"Job {job_id} failed: {error}", extra={"job_id": job_id})
+        else:
+            logger.info(f"Job {job_id} done", extra={"job_id": job_id})
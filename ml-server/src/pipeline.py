@@ -0,0 +1,624 @@
+import logging
+import os
+import time
+
+from detector.helmet_detector import detect_helmet, detect_helmet_batch
+from detector.seatbelt_detector import detect_seatbelt, detect_seatbelt_batch
+from detector.model_registry import predict_batch
+from detector.vehicle_classifier import classify_vehicle_batch, detect_vehicles
+from detector.license_plate_detector import extract_vehicle_number
+from utils.frame import FrameContext
+from utils.metrics import MOTION_FRAMES, span
+from utils.motion import MOTION_GATE, MotionGate
+from utils.stage_graph import StageGraph
+from utils.tracker import IouTracker
+from utils.video import iter_batches, iter_frames, video_info
+
+logger = logging.getLogger(__name__)
+
+FINE_AMOUNT = 500
+
+# Per-track budgets for video/camera input: helmet/seatbelt checks and plate OCR attempts
+TRACK_MAX_CHECKS = int(os.environ.get("TRACK_MAX_CHECKS", "3"))
+TRACK_MAX_OCR = int(os.environ.get("TRACK_MAX_OCR", "2"))
+# Context kept around each vehicle box when cropping, as a fraction of its size
+CROP_PADDING = 0.1
+# Verdict recorded for a helmet/seatbelt check that failed: unknown, so never a violation
+CHECK_FAILED = (None, [], 0.0)
+
+
+def analyze_frame(frame, ocr=True):
+    """
+    Run classification, helmet/seatbelt detection and (optionally) plate OCR on one frame
+    """
+    return analyze_frames([frame], ocr=ocr)[0]
+
+
+def analyze_frames(frames, ocr=True):
+    """
+    analyze_frame for a list of frames. Each model runs once over the frames
+    that need it (yolov8n over all, helmet over bikes, seatbelt over cars)
+    instead of once per frame. After classification, helmet/seatbelt
+    inference and plate OCR run concurrently (see StageGraph).
+    """
+    frames = [FrameContext.from_any(frame) for frame in frames]
+
+    graph = StageGraph()
+    graph.add("classify", lambda _: _classify_frames(frames))
+    graph.add("checks", lambda r: _check_frames(frames, r["classify"][0]), after=("classify",))
+    if ocr:
+        # The plate is searched for in the vehicle boxes of the classify pass (memoized on the frames)
+        graph.add("ocr", lambda _: [read_vehicle_number(frame, _vehicle_boxes(frame)) for frame in frames],
+                  after=("classify",))
+    results = graph.run()
+
+    vehicles, classify_errors = results["classify"]
+    helmet_results, seatbelt_results, check_errors = results["checks"]
+    vehicle_numbers = results.get("ocr") or [None] * len(frames)
+    output = []
+    for i in range(len(frames)):
+        result = build_result(
+            vehicles[i],
+            helmet_results.get(i, (False, [], 0.0)),
+            seatbelt_results.get(i, (False, [], 0.0)),
+            vehicle_numbers[i],
+        )
+        errors = classify_errors.get(i, []) + check_errors.get(i, [])
+        if errors:
+            result["errors"] = errors
+        output.append(result)
+    return output
+
+
+def _classify_frames(frames):
+    """
+    (vehicle type per frame, {frame index: [errors]}); classify_vehicle falls back
+    to "bike" when detection fails, so failures are collected separately
+    """
+    # 🔍 Vehicle classification
+    with span("classify"):
+        vehicles = classify_vehicle_batch(frames)
+    errors = {}
+    for i, frame in enumerate(frames):
+        try:
+            detect_vehicles(frame)
+        except Exception as e:
+            errors[i] = [f"Vehicle detection failed: {e}"]
+    return vehicles, errors
+
+
+def _check_frames(frames, vehicles):
+    """
+    Helmet verdicts for the bike frames and seatbelt verdicts for the car frames,
+    keyed by frame index, plus {frame index: [errors]} for frames whose check failed
+    """
+    helmet_results = {}
+    seatbelt_results = {}
+    errors = {}
+    bikes = [i for i, v in enumerate(vehicles) if v == "bike"]
+    cars = [i for i, v in enumerate(vehicles) if v == "car"]
+
+    # Run appropriate detector
+    if bikes:
+        with span("helmet"):
+            helmet_results, failed = _run_checks("bike", detect_helmet_batch, bikes, [frames[i] for i in bikes])
+        errors.update(failed)
+    if cars:
+        with span("seatbelt"):
+            seatbelt_results, failed = _run_checks("car", detect_seatbelt_batch, cars, [frames[i] for i in cars])
+        errors.update(failed)
+    return helmet_results, seatbelt_results, errors
+
+
+def _run_checks(vehicle, detect_batch, indices, images):
+    """
+    detect_batch over images, as ({index: verdict}, {index: [errors]}).
+    A failed check gets the CHECK_FAILED verdict and an error instead of a "missing" verdict.
+    """
+    try:
+        results = detect_batch(images)
+    except Exception as e:
+        results = [e] * len(images)
+    verdicts = {}
+    errors = {}
+    for i, result in zip(indices, results):
+        if isinstance(result, Exception):
+            logger.warning(f"{violation_type(vehicle)} detection failed: {result}")
+            verdicts[i] = CHECK_FAILED
+            errors[i] = [f"{violation_type(vehicle)} detection failed: {result}"]
+        else:
+            verdicts[i] = result
+    return verdicts, errors
+
+
+def analyze_vehicles(frames, ocr=True):
+    """
+    Per-vehicle analysis of independent frames (e.g. junction photos).
+
+    Every detected vehicle is cropped out of its frame; all bike crops go
+    through the helmet model and all car crops through the seatbelt model in
+    batched passes, and each vehicle gets its own verdict, boxes (in frame
+    coordinates) and plate read from its crop. The helmet/seatbelt passes and
+    the plate reads run concurrently.
+    """
+    frames = [FrameContext.from_any(frame) for frame in frames]
+
+    graph = StageGraph()
+    graph.add("crops", lambda _: _vehicle_crops(frames))
+    graph.add("checks", lambda r: _check_crops(r["crops"][0]), after=("crops",))
+    if ocr:
+        graph.add("ocr", lambda r: [read_vehicle_number(crop, shift_boxes([detection], (-offset[0], -offset[1])))
+                                    for _, detection, crop, offset in r["crops"][0]], after=("crops",))
+    results = graph.run()
+
+    crops, frame_errors = results["crops"]
+    checks, check_errors = results["checks"]
+    vehicle_numbers = results.get("ocr") or [None] * len(crops)
+
+    output = [[] for _ in frames]
+    for n, (i, detection, crop, offset) in enumerate(crops):
+        present, boxes, conf = checks[n]
+        result = (present, shift_boxes(boxes, offset), conf)
+        vehicle = detection["type"]
+        entry = build_result(
+            vehicle,
+            result if vehicle == "bike" else (False, [], 0.0),
+            result if vehicle == "car" else (False, [], 0.0),
+            vehicle_numbers[n],
+        )
+        entry.update({
+            "id": len(output[i]),
+            "class": detection["class"],
+            "vehicle_confidence": detection["confidence"],
+            "vehicle_box": {k: detection[k] for k in ("x1", "y1", "x2", "y2")},
+        })
+        if n in check_errors:
+            entry["errors"] = check_errors[n]
+        output[i].append(entry)
+
+    summaries = []
+    for i, vehicles in enumerate(output):
+        summary = {
+            "mode": "vehicles",
+            "count": len(vehicles),
+            "violations": sum(1 for v in vehicles if v["violation"]),
+            "violation": any(v["violation"] for v in vehicles),
+            "fine": sum(v["fine"] for v in vehicles),
+            "vehicles": vehicles,
+        }
+        if i in frame_errors:
+            summary["errors"] = frame_errors[i]
+        summaries.append(summary)
+    return summaries
+
+
+def _vehicle_crops(frames):
+    """
+    (frame index, detection, crop, offset) for every vehicle in every frame,
+    plus {frame index: [errors]} for frames where vehicle detection failed
+    """
+    try:
+        with span("classify"):
+            predict_batch("vehicle", frames)
+    except Exception as e:
+        logger.warning(f"Batched vehicle inference failed, falling back to per-frame: {e}")
+
+    crops = []
+    errors = {}
+    for i, frame in enumerate(frames):
+        try:
+            detections = detect_vehicles(frame)
+        except Exception as e:
+            logger.warning(f"Vehicle detection failed: {e}")
+            errors[i] = [f"Vehicle detection failed: {e}"]
+            detections = []
+        for detection in detections:
+            try:
+                crop, offset = frame.crop(detection, padding=CROP_PADDING)
+            except ValueError:
+                continue
+            crops.append((i, detection, crop, offset))
+    return crops, errors
+
+
+def _check_crops(crops):
+    """
+    Helmet/seatbelt verdict per crop index, from one batched pass per model,
+    plus {crop index: [errors]} for crops whose check failed
+    """
+    checks = {}
+    errors = {}
+    for vehicle, detect_batch in (("bike", detect_helmet_batch), ("car", detect_seatbelt_batch)):
+        indices = [n for n, c in enumerate(crops) if c[1]["type"] == vehicle]
+        if not indices:
+            continue
+        with span(violation_type(vehicle).lower()):
+            verdicts, failed = _run_checks(vehicle, detect_batch, indices, [crops[n][2] for n in indices])
+        checks.update(verdicts)
+        errors.update(failed)
+    return checks, errors
+
+
+def build_result(vehicle, helmet_result, seatbelt_result, vehicle_number):
+    helmet, helmet_boxes, helmet_conf = helmet_result
+    seatbelt, seatbelt_boxes, seatbelt_conf = seatbelt_result
+
+    # 🚨 Violation logic and fine
+    violation = False
+    fine = 0
+    if vehicle == "bike":
+        if helmet is False:
+            violation = True
+            fine = FINE_AMOUNT
+    if vehicle == "car":
+        if seatbelt is False:
+            violation = True
+            fine = FINE_AMOUNT
+
+    return {
+        "vehicle": vehicle,
+        "helmet": bool(helmet),
+        "helmet_confidence": float(helmet_conf),
+        "helmet_boxes": helmet_boxes,
+        "seatbelt": bool(seatbelt),
+        "seatbelt_confidence": float(seatbelt_conf),
+        "seatbelt_boxes": seatbelt_boxes,
+        "violation": violation,
+        "fine": fine,
+        "vehicleNumber": vehicle_number,
+    }
+
+
+def _vehicle_boxes(frame):
+    """
+    The frame's vehicle boxes from the shared yolov8n pass ([] when it failed)
+    """
+    try:
+        return detect_vehicles(frame)
+    except Exception:
+        return []
+
+
+def read_vehicle_number(frame, vehicle_regions=None):
+    """
+    Plate read of a frame or vehicle crop; vehicle_regions (boxes in its coordinates)
+    narrow the plate search, without them the whole image is searched
+    """
+    try:
+        with span("ocr"):
+            return extract_vehicle_number(frame, vehicle_regions=vehicle_regions)
+    except Exception as e:
+        logger.warning(f"Vehicle number extraction failed: {e}")
+        return "DETECT_FAILED"
+
+
+def violation_type(vehicle):
+    return "Helmet" if vehicle == "bike" else "Seatbelt"
+
+
+class TrackedAnalyzer:
+    """
+    Per-vehicle analysis over a sequence of frames (video clip or camera).
+
+    Vehicles from the shared yolov8n pass are tracked across frames; the
+    helmet/seatbelt check runs on the vehicle crop at most `max_checks` times
+    per track and plate OCR at most `max_ocr` times (until a plate is read).
+    Verdicts are majority votes over a track's checks, and a violation event
+    is emitted when its track ends.
+
+    With a motion_gate, frames showing no significant change skip every model;
+    tracks are left as they are until the next analyzed frame.
+    """
+
+    def __init__(self, max_checks=TRACK_MAX_CHECKS, max_ocr=TRACK_MAX_OCR,
+                 iou_threshold=0.3, max_misses=3, motion_gate=None):
+        self.max_checks = max_checks
+        self.max_ocr = max_ocr
+        self.tracker = IouTracker(iou_threshold=iou_threshold, max_misses=max_misses)
+        self.motion_gate = motion_gate
+        self.stats = {"frames": 0, "skipped": 0, "tracks": 0, "checks": 0, "check_errors": 0, "ocr_attempts": 0}
+
+    def process(self, frame, index, timestamp=None):
+        """
+        Feed one frame; returns violation events for tracks that ended on it
+        """
+        frame = FrameContext.from_any(frame)
+        if not self._admit(frame):
+            return []
+        return self._analyze(frame, index, timestamp)
+
+    def _admit(self, frame):
+        """
+        Count the frame and run it past the motion gate; False means skip it
+        """
+        self.stats["frames"] += 1
+        if self.motion_gate is None:
+            return True
+        with span("motion"):
+            active = self.motion_gate.check(frame.bgr)
+        MOTION_FRAMES.inc(decision="analyzed" if active else "skipped")
+        if not active:
+            self.stats["skipped"] += 1
+        return active
+
+    def _analyze(self, frame, index, timestamp):
+        with span("classify"):
+            vehicles = detect_vehicles(frame)
+        matched, finished = self.tracker.update(vehicles, index)
+        for track in matched:
+            self._observe(track, frame, index, timestamp)
+        return self._events(finished)
+
+    def process_batch(self, batch):
+        """
+        Feed a list of (frame, index, timestamp); the yolov8n pass runs once for the
+        whole batch, tracking then proceeds frame by frame in order
+        """
+        frames = [FrameContext.from_any(frame) for frame, _, _ in batch]
+        # Gate in order first, so skipped frames stay out of the batched pass too
+        active = [(frame, index, timestamp) for frame, (_, index, timestamp) in zip(frames, batch)
+                  if self._admit(frame)]
+        if not active:
+            return []
+        try:
+            with span("classify"):
+                predict_batch("vehicle", [frame for frame, _, _ in active])
+        except Exception as e:
+            logger.warning(f"Batched vehicle inference failed, falling back to per-frame: {e}")
+        events = []
+        for frame, index, timestamp in active:
+            events.extend(self._analyze(frame, index, timestamp))
+        return events
+
+    def flush(self):
+        """
+        End of input: close every remaining track
+        """
+        return self._events(self.tracker.flush())
+
+    def _observe(self, track, frame, index, timestamp):
+        state = track.state
+        if not state:
+            self.stats["tracks"] += 1
+            state.update({
+                "vehicle": track.detection["type"],
+                "start_frame": index,
+                "start_time": timestamp,
+                "checks": 0,
+                "votes": [],
+                "confidence": 0.0,
+                "boxes": [],
+                "ocr_attempts": 0,
+                "vehicleNumber": None,
+            })
+        state["end_frame"] = index
+        state["end_time"] = timestamp
+
+        need_check = state["checks"] < self.max_checks
+        need_plate = state["vehicleNumber"] is None and state["ocr_attempts"] < self.max_ocr
+        if not need_check and not need_plate:
+            return
+
+        try:
+            crop, offset = frame.crop(track.detection, padding=CROP_PADDING)
+        except ValueError:
+            return
+
+        if need_check:
+            detect = detect_helmet if state["vehicle"] == "bike" else detect_seatbelt
+            try:
+                with span(violation_type(state["vehicle"]).lower()):
+                    present, boxes, conf = detect(crop)
+            except Exception as e:
+                # No vote: a failed check says nothing about the helmet/seatbelt; retried next frame
+                logger.warning(f"Track {track.id} check failed: {e}")
+                self.stats["check_errors"] += 1
+            else:
+                state["checks"] += 1
+                self.stats["checks"] += 1
+                state["votes"].append(bool(present))
+                if conf >= state["confidence"]:
+                    state["confidence"] = float(conf)
+                    state["boxes"] = shift_boxes(boxes, offset)
+
+        if need_plate:
+            state["ocr_attempts"] += 1
+            self.stats["ocr_attempts"] += 1
+            number = read_vehicle_number(crop, shift_boxes([track.detection], (-offset[0], -offset[1])))
+            if number not in ("Unknown", "DETECT_FAILED"):
+                state["vehicleNumber"] = number
+
+    def _events(self, tracks):
+        events = []
+        for track in tracks:
+            state = track.state
+            if not state or not state["votes"]:
+                continue
+            # Violation when most checks on this vehicle found no helmet/seatbelt
+            missing = state["votes"].count(False)
+            if missing * 2 <= len(state["votes"]):
+                continue
+            events.append({
+                "track_id": track.id,
+                "vehicle": state["vehicle"],
+                "type": violation_type(state["vehicle"]),
+                "fine": FINE_AMOUNT,
+                "start_frame": state["start_frame"],
+                "end_frame": state["end_frame"],
+                "start_time": state["start_time"],
+                "end_time": state["end_time"],
+                "frames": track.hits,
+                "checks": state["checks"],
+                "confidence": state["confidence"],
+                "boxes": state["boxes"],
+                "vehicle_box": {k: track.detection[k] for k in ("x1", "y1", "x2", "y2")},
+                "vehicleNumber": state["vehicleNumber"] or "Unknown",
+            })
+        return events
+
+
+def shift_boxes(boxes, offset):
+    """
+    Translate crop-relative boxes back into frame coordinates
+    """
+    ox, oy = offset
+    shifted = []
+    for b in boxes:
+        b = dict(b)
+        b['x1'] += ox
+        b['x2'] += ox
+        b['y1'] += oy
+        b['y2'] += oy
+        shifted.append(b)
+    return shifted
+
+
+def motion_gate(enabled=None):
+    """
+    A fresh MotionGate when gating is on (MOTION_GATE unless enabled says otherwise), else None
+    """
+    return MotionGate() if (MOTION_GATE if enabled is None else enabled) else None
+
+
+def iter_video(path, stride=None, fps=None, batch_size=8, progress=None, motion=None):
+    """
+    analyze_video as a generator of (kind, payload) messages, for streaming
+    results while the clip is still being analyzed:
+
+      ("violation", event)  as soon as a violating vehicle's track ends
+      ("progress", {...})   after every batch (frames done, fraction)
+      ("done", summary)     last; analyze_video's result without the events
+
+    Nothing but the open tracks is kept in memory. motion=False analyzes
+    every sampled frame even when the motion gate is on by default.
+    """
+    info = video_info(path)
+    analyzer = TrackedAnalyzer(motion_gate=motion_gate(motion))
+    last_index = -1
+    violations = 0
+    fine = 0
+
+    for batch in iter_batches(iter_frames(path, stride=stride, fps=fps), batch_size):
+        events = analyzer.process_batch([
+            (FrameContext.from_bgr(image), index, timestamp) for index, timestamp, image in batch
+        ])
+        for event in events:
+            violations += 1
+            fine += event["fine"]
+            yield "violation", event
+        last_index = batch[-1][0]
+        fraction = min(1.0, (last_index + 1) / info["frame_count"]) if info["frame_count"] > 0 else None
+        if progress is not None:
+            # Called even when the length is unknown (fraction None): it doubles as the job heartbeat
+            progress(fraction)
+        yield "progress", {
+            "last_frame": last_index,
+            "frames_sampled": analyzer.stats["frames"],
+            "frames_skipped": analyzer.stats["skipped"],
+            "progress": fraction,
+        }
+    for event in analyzer.flush():
+        violations += 1
+        fine += event["fine"]
+        yield "violation", event
+
+    yield "done", {
+        "video": info,
+        "frames_sampled": analyzer.stats["frames"],
+        "frames_skipped": analyzer.stats["skipped"],
+        "last_frame": last_index,
+        "stats": analyzer.stats,
+        "violations": violations,
+        "violation": violations > 0,
+        "fine": fine,
+    }
+
+
+def analyze_video(path, stride=None, fps=None, batch_size=8, progress=None, motion=None):
+    """
+    Analyze a video file and return a per-vehicle violation timeline.
+
+    Frames are decoded with OpenCV and sampled every `stride` frames (or at
+    `fps` frames per second). Sampled frames are processed in batches of
+    `batch_size`, so memory stays bounded regardless of clip length.
+    Vehicles are tracked across sampled frames, so helmet/seatbelt checks and
+    plate OCR run a few times per vehicle instead of on every frame.
+    progress(fraction) is called after every batch, with fraction None when
+    the container doesn't report a frame count; an exception it raises
+    aborts the analysis (used for job cancellation). Frames on which the
+    motion gate sees no change are skipped (frames_skipped).
+    """
+    events = []
+    summary = None
+    messages = iter_video(path, stride=stride, fps=fps, batch_size=batch_size, progress=progress, motion=motion)
+    for kind, payload in messages:
+        if kind == "violation":
+            events.append(payload)
+        elif kind == "done":
+            summary = payload
+    events.sort(key=lambda e: (e["start_frame"], e["track_id"]))
+
+    first = events[0] if events else None
+    return {
+        "video": summary["video"],
+        "frames_sampled": summary["frames_sampled"],
+        "frames_skipped": summary["frames_skipped"],
+        "last_frame": summary["last_frame"],
+        "stats": summary["stats"],
+        "events": events,
+        "violation": bool(events),
+        "vehicle": first["vehicle"] if first else None,
+        "fine": sum(e["fine"] for e in events),
+        "vehicleNumber": first["vehicleNumber"] if first else None,
+    }
+
+
+def analyze_stream(reader, on_event=None, max_frames=None, duration=None, motion=None):
+    """
+    Analyze a live source (utils.stream.LatestFrameReader) until it ends,
+    reader.stop() is called, or max_frames / duration (seconds) is reached.
+
+    Each iteration takes the newest decoded frame, so when inference is
+    slower than the camera the frames in between are dropped rather than
+    queued. on_event(event) is called with each violation event as soon as
+    its track ends; events are not kept, so memory stays flat on long runs.
+    Frames the motion gate finds unchanged are skipped (stats["skipped"]).
+    """
+    analyzer = TrackedAnalyzer(motion_gate=motion_gate(motion))
+    started = time.monotonic()
+    violations = 0
+
+    def emit(events):
+        nonlocal violations
+        for event in events:
+            violations += 1
+            if on_event is not None:
+                on_event(event)
+
+    if not reader.running:
+        reader.start()
+    try:
+        while True:
+            item = reader.read()
+            if item is None:
+                break
+            index, timestamp, image = item
+            emit(analyzer.process(FrameContext.from_bgr(image), index, timestamp))
+            if max_frames is not None and analyzer.stats["frames"] >= max_frames:
+                break
+            if duration is not None and time.monotonic() - started >= duration:
+                break
+    finally:
+        reader.stop()
+    emit(analyzer.flush())
+
+    return {
+        "source": str(reader.source),
+        "fps": reader.fps,
+        "seconds": round(time.monotonic() - started, 3),
+        "ingest": dict(reader.stats),
+        "frames_skipped": analyzer.stats["skipped"],
+        "stats": analyzer.stats,
+        "violations": violations,
+        "error": reader.error,
+    }
@@ -0,0 +1,126 @@
+"""
+Produce INT8 variants of the YOLO models and gate them against FP32.
+
+For each model the .pt weights are exported to FP32 ONNX, quantized with
+ONNX Runtime (static: calibrated on --calibration images; dynamic: weights
+only) and written next to the weights as <name>_int8.onnx. The INT8 model is
+then compared with the FP32 PyTorch model on --eval images: box
+precision/recall, helmet/seatbelt verdict agreement and per-image latency
+(FP32 ONNX latency is reported too). Exits non-zero when a model regresses
+past the thresholds; the detectors only use a variant when it is selected
+with MODEL_PRECISION / MODEL_PRECISION_<NAME>=int8.
+
+    python quantize_models.py --calibration ../calib --eval ../eval --models helmet seatbelt
+"""
+import argparse
+import json
+import os
+import sys
+
+from check_engine_parity import compare_models, detections, load_images
+from detector.inference_engine import INFERENCE_IMGSZ, export_model, exported_path, load_model, quantized_path
+from detector.model_registry import DEFAULT_CONF, MODEL_FILES, resolve_model_path
+from detector.quantization import QUANT_MODES, quantize_onnx
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Quantize the YOLO models to INT8 and check them against FP32")
+    parser.add_argument("--models", nargs="+", default=list(MODEL_FILES), choices=list(MODEL_FILES))
+    parser.add_argument("--mode", choices=QUANT_MODES, default="static")
+    parser.add_argument("--calibration", help="image folder for static calibration")
+    parser.add_argument("--calibration-limit", type=int, default=300)
+    parser.add_argument("--eval", dest="eval_dir", help="image folder for the FP32 comparison (default: --calibration)")
+    parser.add_argument("--eval-limit", type=int, default=500)
+    parser.add_argument("--imgsz", type=int, default=INFERENCE_IMGSZ)
+    parser.add_argument("--conf", type=float, default=DEFAULT_CONF)
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU for an INT8 box to match an FP32 box")
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--min-precision", type=float, default=0.9)
+    parser.add_argument("--min-verdict-agreement", type=float, default=0.98,
+                        help="share of images where INT8 and FP32 reach the same helmet/seatbelt verdict")
+    parser.add_argument("--skip-quantize", action="store_true", help="only evaluate existing INT8 models")
+    parser.add_argument("--report", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+    if args.mode == "static" and not args.calibration and not args.skip_quantize:
+        parser.error("--calibration is required for static quantization")
+    if not args.eval_dir and not args.calibration:
+        parser.error("--eval (or --calibration) is required")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    calibration = []
+    if args.calibration and not args.skip_quantize:
+        calibration = [image for _, image in load_images(args.calibration, args.calibration_limit)]
+        print(f"Calibrating on {len(calibration)} images from {args.calibration}")
+    eval_dir = args.eval_dir or args.calibration
+    if eval_dir == args.calibration:
+        print("Evaluating on the calibration images; use --eval with held-out images for a fair gate")
+    images = load_images(eval_dir, args.eval_limit)
+    if not images:
+        print(f"No images found in {eval_dir}")
+        return 2
+
+    report = {"mode": args.mode, "imgsz": args.imgsz, "eval_images": len(images), "models": {}}
+    failed = False
+    done = {}
+    for name in args.models:
+        weights = resolve_model_path(name)
+        if weights in done:
+            report["models"][name] = done[weights]
+            continue
+
+        int8_path = quantized_path(weights, "int8")
+        if not args.skip_quantize:
+            fp32_path = exported_path(weights, "onnx")
+            if not os.path.exists(fp32_path):
+                fp32_path = export_model(weights, "onnx", imgsz=args.imgsz)
+            print(f"Quantizing {fp32_path} -> {int8_path} ({args.mode})")
+            quantize_onnx(fp32_path, int8_path, mode=args.mode, calibration_images=calibration, imgsz=args.imgsz)
+
+        reference = load_model(weights, engine="torch")
+        candidate = load_model(weights, precision="int8")
+        if candidate.precision != "int8":
+            print(f"{name}: could not load {int8_path}")
+            failed = True
+            continue
+
+        stats = compare_models(reference, candidate, images, conf=args.conf, iou_threshold=args.iou)
+        fp32_onnx = load_model(weights, engine="onnx")
+        if fp32_onnx.engine == "onnx":
+            fp32_onnx(images[0][1], verbose=False)
+            seconds = sorted(detections(fp32_onnx, image, args.conf)[1] for _, image in images)
+            stats["fp32_onnx_ms"] = 1000 * seconds[len(seconds) // 2]
+
+        stats["weights"] = os.path.basename(weights)
+        stats["int8_model"] = os.path.basename(int8_path)
+        stats["size_mb"] = {
+            "fp32": round(os.path.getsize(weights) / 1e6, 2) if os.path.exists(weights) else None,
+            "int8": round(os.path.getsize(int8_path) / 1e6, 2),
+        }
+        stats["speedup"] = stats["reference_ms"] / stats["candidate_ms"] if stats["candidate_ms"] else None
+        stats["passed"] = (
+            stats["recall"] >= args.min_recall
+            and stats["precision"] >= args.min_precision
+            and stats["verdict_agreement"] >= args.min_verdict_agreement
+        )
+        failed = failed or not stats["passed"]
+        done[weights] = report["models"][name] = stats
+        print(
+            f"{name} ({stats['weights']}): {'PASS' if stats['passed'] else 'FAIL'} "
+            f"recall {stats['recall']:.3f}, precision {stats['precision']:.3f}, "
+            f"verdict agreement {stats['verdict_agreement']:.3f}, "
+            f"fp32 {stats['reference_ms']:.1f}ms vs int8 {stats['candidate_ms']:.1f}ms"
+        )
+
+    report["passed"] = not failed
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
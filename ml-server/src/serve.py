@@ -0,0 +1,177 @@
+"""
+Production serving mode for the ML server.
+
+The master process loads every PyTorch model once, binds the listening socket
+and forks N workers that share the weights copy-on-write and accept from the
+same socket. Models on ONNX Runtime or OpenVINO (INFERENCE_ENGINE, int8
+precision) are loaded by each worker after fork instead, since their thread
+pools don't survive it. Dead workers are restarted; SIGTERM/SIGINT stop all
+of them.
+
+    python serve.py --workers 4 --torch-threads 2 --pin-cpus
+
+`python app.py` remains the single-process development server.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from utils.log import configure_logging
+
+logger = logging.getLogger("serve")
+
+
+def parse_args(argv=None):
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Pre-fork production server for the ML server")
+    parser.add_argument("--host", default=os.environ.get("ML_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("ML_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("ML_WORKERS", str(cpus))),
+                        help="worker processes to fork (default: one per core)")
+    parser.add_argument("--torch-threads", type=int, default=int(os.environ.get("ML_TORCH_THREADS", "0")),
+                        help="intra-op threads per worker (default: cores / workers)")
+    parser.add_argument("--cv-threads", type=int, default=int(os.environ.get("ML_CV_THREADS", "1")),
+                        help="OpenCV threads per worker")
+    parser.add_argument("--pin-cpus", action="store_true", default=os.environ.get("ML_PIN_CPUS", "0") == "1",
+                        help="pin each worker to its own block of cores (Linux only)")
+    parser.add_argument("--warmup", action="store_true", default=os.environ.get("ML_WARMUP", "0") == "1",
+                        help="finish each worker's warm-up inference before accepting requests")
+    parser.add_argument("--backlog", type=int, default=128)
+    args = parser.parse_args(argv)
+    args.workers = max(1, args.workers)
+    if args.torch_threads <= 0:
+        args.torch_threads = max(1, cpus // args.workers)
+    return args
+
+
+def worker_cpus(slot, threads):
+    """
+    Block of cores worker `slot` is pinned to, wrapping around the available cores
+    """
+    available = sorted(os.sched_getaffinity(0))
+    start = (slot * threads) % len(available)
+    return {available[(start + i) % len(available)] for i in range(min(threads, len(available)))}
+
+
+def configure_threads(args):
+    # Thread pools read these when first created; set before torch/OpenCV start them
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(args.torch_threads)
+    # ONNX Runtime ignores those: its sessions take the same budget explicitly
+    os.environ["INFERENCE_THREADS"] = str(args.torch_threads)
+    # The master loads without warming up: inference would start OpenMP pools that
+    # don't survive fork. Each worker warms up (and flips /ready) on its own.
+    os.environ["ML_BACKGROUND_INIT"] = "0"
+
+
+def run_worker(slot, args, sock, app):
+    if args.pin_cpus and hasattr(os, "sched_setaffinity"):
+        cpus = worker_cpus(slot, args.torch_threads)
+        os.sched_setaffinity(0, cpus)
+        logger.info(f"Worker {slot} (pid {os.getpid()}) pinned to cpus {sorted(cpus)}")
+
+    import cv2
+    import torch
+
+    torch.set_num_threads(args.torch_threads)
+    cv2.setNumThreads(args.cv_threads)
+
+    from app import start_job_workers, start_warm_up, warm_up
+
+    # --warmup: finish warm-up before accepting; otherwise accept right away and
+    # report not-ready on /ready until the background warm-up is done
+    if args.warmup:
+        warm_up()
+    else:
+        start_warm_up()
+
+    # Each worker process drains the shared job queue with its own threads
+    start_job_workers()
+
+    from werkzeug.serving import make_server
+
+    server = make_server(args.host, args.port, app, threaded=True, fd=sock.fileno())
+    logger.info(f"Worker {slot} (pid {os.getpid()}) serving on {args.host}:{args.port}, torch_threads={args.torch_threads}")
+    server.serve_forever()
+
+
+def spawn(slot, args, sock, app):
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            run_worker(slot, args, sock, app)
+        except Exception as e:
+            logger.exception(f"Worker {slot} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging()
+    configure_threads(args)
+
+    # Load in the master so workers inherit the weights copy-on-write
+    from app import app, load_resources
+
+    load_resources(before_fork=True)
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    # Keep the garbage collector from touching (and so copying) the inherited heap
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    for slot in range(args.workers):
+        workers[spawn(slot, args, sock, app)] = slot
+    logger.info(f"Master (pid {os.getpid()}) started {args.workers} workers on {args.host}:{args.port}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = workers.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        logger.warning(f"Worker {slot} (pid {pid}) exited with status {status}, restarting")
+        time.sleep(1)
+        workers[spawn(slot, args, sock, app)] = slot
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import io
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class FrameContext:
+    """
+    A single decoded frame shared by every detection stage.
+
+    The upload is decoded once; RGB/BGR/grayscale/PIL views are derived
+    lazily on first access and reused by later stages. Views are shared,
+    so callers must treat them as read-only (copy before drawing on them).
+    """
+
+    def __init__(self, data=None, pil_image=None, rgb=None, bgr=None):
+        self.data = data
+        self._views = {}
+        self._lock = threading.RLock()
+        if pil_image is not None:
+            self._views["pil"] = pil_image if pil_image.mode == "RGB" else pil_image.convert("RGB")
+        if rgb is not None:
+            self._views["rgb"] = rgb
+        if bgr is not None:
+            self._views["bgr"] = bgr
+        if data is None and not self._views:
+            raise ValueError("FrameContext needs encoded bytes or a decoded image")
+
+    # ----------------------
+    # Constructors
+    # ----------------------
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data=data)
+
+    @classmethod
+    def from_pil(cls, image):
+        return cls(pil_image=image)
+
+    @classmethod
+    def from_bgr(cls, array):
+        return cls(bgr=array)
+
+    @classmethod
+    def from_rgb(cls, array):
+        return cls(rgb=array)
+
+    @classmethod
+    def from_any(cls, source):
+        """
+        Wrap whatever a caller handed to a detector (frame context, raw bytes,
+        file-like object, PIL image or BGR ndarray) in a FrameContext
+        """
+        if isinstance(source, FrameContext):
+            return source
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(bytes(source))
+        if isinstance(source, Image.Image):
+            return cls.from_pil(source)
+        if isinstance(source, np.ndarray):
+            return cls.from_bgr(source)
+        if hasattr(source, "read"):
+            try:
+                source.seek(0)
+            except Exception:
+                pass
+            return cls.from_bytes(source.read())
+        raise TypeError(f"Unsupported image source: {type(source).__name__}")
+
+    # ----------------------
+    # Lazy views
+    # ----------------------
+    def cached(self, key, factory):
+        """
+        Return the value stored under key, computing it with factory() on first use
+        """
+        value = self._views.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            value = self._views.get(key)
+            if value is None:
+                value = factory()
+                self._views[key] = value
+            return value
+
+    def has(self, key):
+        return key in self._views
+
+    @property
+    def pil(self):
+        return self.cached("pil", self._make_pil)
+
+    @property
+    def rgb(self):
+        return self.cached("rgb", self._make_rgb)
+
+    @property
+    def bgr(self):
+        return self.cached("bgr", lambda: cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR))
+
+    @property
+    def gray(self):
+        return self.cached("gray", self._make_gray)
+
+    @property
+    def width(self):
+        return self.shape[1]
+
+    @property
+    def height(self):
+        return self.shape[0]
+
+    @property
+    def shape(self):
+        for key in ("rgb", "bgr"):
+            if key in self._views:
+                return self._views[key].shape
+        width, height = self.pil.size
+        return (height, width, 3)
+
+    def crop(self, box, padding=0.0):
+        """
+        Crop box (dict with x1/y1/x2/y2) out of the frame, padded by a fraction
+        of its size. Returns (FrameContext, (offset_x, offset_y)).
+        """
+        height, width = self.shape[:2]
+        pad_x = int((box['x2'] - box['x1']) * padding)
+        pad_y = int((box['y2'] - box['y1']) * padding)
+        x1 = max(0, int(box['x1']) - pad_x)
+        y1 = max(0, int(box['y1']) - pad_y)
+        x2 = min(width, int(box['x2']) + pad_x)
+        y2 = min(height, int(box['y2']) + pad_y)
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError("Empty crop")
+        crop = np.ascontiguousarray(self.bgr[y1:y2, x1:x2])
+        return FrameContext.from_bgr(crop), (x1, y1)
+
+    def _make_pil(self):
+        if "rgb" in self._views:
+            return Image.fromarray(self._views["rgb"])
+        if "bgr" in self._views:
+            return Image.fromarray(cv2.cvtColor(self._views["bgr"], cv2.COLOR_BGR2RGB))
+        # Memory-mapped files are file-like already; decode from them without a copy
+        source = self.data if hasattr(self.data, "read") else io.BytesIO(self.data)
+        return Image.open(source).convert("RGB")
+
+    def _make_rgb(self):
+        if "bgr" in self._views:
+            return cv2.cvtColor(self._views["bgr"], cv2.COLOR_BGR2RGB)
+        return np.array(self.pil)
+
+    def _make_gray(self):
+        if "bgr" in self._views and "rgb" not in self._views:
+            return cv2.cvtColor(self._views["bgr"], cv2.COLOR_BGR2GRAY)
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
@@ -0,0 +1,43 @@
+import mmap
+import os
+from contextlib import contextmanager
+
+
+def resolve_shared_path(path, root):
+    """
+    Real path of a file inside the shared upload directory. Relative paths are
+    taken relative to root; anything resolving outside it (.., symlinks) is refused.
+    """
+    if not root:
+        raise PermissionError("Path ingest is disabled (SHARED_UPLOAD_DIR is not set)")
+    root = os.path.realpath(root)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise PermissionError(f"'{path}' is outside the shared upload directory")
+    if not os.path.isfile(full):
+        raise FileNotFoundError(f"No such file: '{path}'")
+    return full
+
+
+@contextmanager
+def open_shared_file(path, root):
+    """
+    Read-only memory map of a file in the shared upload directory, closed on exit.
+    Hashing and decoding read straight from the page cache instead of a copied buffer.
+    """
+    full = resolve_shared_path(path, root)
+    with open(full, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"'{path}' is empty")
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Filesystems without mmap support: fall back to one plain read
+            mapped = None
+        if mapped is None:
+            yield f.read()
+            return
+        try:
+            yield mapped
+        finally:
+            mapped.close()
@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# LOG_LEVEL: DEBUG shows per-frame detector detail (candidates, OCR readings, classes)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# LOG_FORMAT: text for humans, json for one object per line (log shippers)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+# Fraction of DEBUG/INFO records emitted; warnings and errors are never dropped
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+
+# Attributes every LogRecord has; anything else came in through extra= and is a structured field
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps every warning/error and a random `rate` share of everything below
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
+
+_configured = False
+
+
+def configure_logging(level=None, fmt=None, sample_rate=None):
+    """
+    Install the stdout handler on the root logger (once per process)
+    """
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else TextFormatter())
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE if sample_rate is None else sample_rate))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level or LOG_LEVEL)
+    # Per-request access lines come from our own request log instead
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    logging.Formatter.converter = time.gmtime
+    _configured = True
@@ -0,0 +1,229 @@
+import contextvars
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets (seconds) shared by every histogram: sub-ms OCR reads up to minute-long videos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self, const_labels=()):
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        for key, value in items:
+            pairs = list(zip(self.labelnames, key)) + list(const_labels)
+            lines.append(f"{self.name}{_format_labels(pairs)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self, const_labels=()):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            pairs = list(zip(self.labelnames, key)) + list(const_labels)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _format_labels(pairs + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics of this process, rendered in the Prometheus text format.
+
+    Collectors are callables returning [(name, type, help, [(labels dict, value)])]
+    for values that already live elsewhere (cache stats) and are read at scrape time.
+
+    Values are not shared between the workers serve.py forks, so every series
+    carries a pid label naming the worker that produced it: a scrape returns
+    one worker's series, and cluster-wide figures are sums over pid
+    (e.g. sum without (pid) (rate(ml_request_duration_seconds_count[5m]))).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        # Read at scrape time: the pid changes in forked workers
+        const_labels = [("pid", os.getpid())]
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render(const_labels))
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    pairs = sorted(labels.items()) + const_labels
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "ml_request_duration_seconds", "HTTP request latency", ("endpoint", "method", "status"))
+STAGE_SECONDS = REGISTRY.histogram(
+    "ml_stage_duration_seconds", "Time spent in each pipeline stage", ("stage",))
+MODEL_INFERENCES = REGISTRY.counter(
+    "ml_model_inferences_total", "Model forward passes", ("model", "precision"))
+MODEL_FRAMES = REGISTRY.counter(
+    "ml_model_frames_total", "Frames run through each model", ("model", "precision"))
+MODEL_SECONDS = REGISTRY.histogram(
+    "ml_model_inference_duration_seconds", "Model forward pass latency", ("model", "precision"))
+MICRO_BATCH_REQUESTS = REGISTRY.histogram(
+    "ml_micro_batch_requests", "Concurrent callers coalesced into one forward pass", ("model",),
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32))
+MOTION_FRAMES = REGISTRY.counter(
+    "ml_motion_frames_total", "Video/camera frames analyzed or skipped by the motion gate", ("decision",))
+OCR_ATTEMPTS = REGISTRY.counter(
+    "ml_ocr_attempts_total", "Tesseract reads by preprocessing variant", ("engine", "variant"))
+OCR_ATTEMPTS_PER_PLATE = REGISTRY.histogram(
+    "ml_ocr_attempts_per_plate", "Tesseract reads needed per plate image", (),
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 12, 16, 20))
+OCR_RESULTS = REGISTRY.counter(
+    "ml_ocr_results_total", "Plate OCR outcomes (read, failed, cached)", ("outcome",))
+
+# Stage spans of the request being handled (None outside a request)
+_trace = contextvars.ContextVar("ml_trace", default=None)
+
+
+def start_trace():
+    spans = []
+    _trace.set(spans)
+    return spans
+
+
+def end_trace():
+    spans = _trace.get()
+    _trace.set(None)
+    return spans or []
+
+
+@contextmanager
+def span(stage):
+    """
+    Time a pipeline stage into ml_stage_duration_seconds and the current request's trace
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def summarize_spans(spans):
+    """
+    {stage: total ms} for a request's spans (repeated stages such as OCR attempts are summed)
+    """
+    totals = {}
+    for stage, seconds in spans:
+        totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+    return {stage: round(ms, 2) for stage, ms in totals.items()}
+
+
+def process_collector():
+    # The registry adds the pid label
+    return [("ml_process_info", "gauge", "Worker process serving this scrape", [({}, 1)])]
+
+
+REGISTRY.register_collector(process_collector)
@@ -0,0 +1,122 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending:
+    __slots__ = ("items", "done", "results", "error")
+
+    def __init__(self, items):
+        self.items = items
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Coalesces calls from concurrent threads into one batched call.
+
+    submit(items) queues the items and blocks until they have been processed.
+    A dispatcher thread takes the first waiting submission, keeps collecting
+    others for up to max_wait seconds or until max_batch items, then calls
+    run(all_items) once and hands every caller back its own slice of the
+    results (or the exception run raised). Errors are confined to their
+    batch: the dispatcher keeps serving later submissions.
+
+    The wait only applies while callers are actually concurrent (the previous
+    batch coalesced several submissions): a lone caller takes what is already
+    queued and runs at once.
+
+    The dispatcher starts on first use and again after fork, so instances can
+    be created at import time in a pre-fork master.
+    """
+
+    def __init__(self, run, max_batch=16, max_wait=0.005, name="micro-batch", on_batch=None):
+        self.run = run
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.name = name
+        self.on_batch = on_batch
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._carry = None
+        self._last_batch = 1
+
+    def submit(self, items):
+        items = list(items)
+        if not items:
+            return []
+        pending = _Pending(items)
+        self._ensure_started().put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.results
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._carry = None
+                self._last_batch = 1
+                threading.Thread(target=self._loop, args=(self._queue,), name=self.name, daemon=True).start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def _collect(self, requests):
+        first = self._carry or requests.get()
+        self._carry = None
+        batch = [first]
+        size = len(first.items)
+        # No sign of concurrent callers: don't hold the lone one back
+        wait = self.max_wait if self._last_batch > 1 else 0.0
+        deadline = time.monotonic() + wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                pending = requests.get(timeout=remaining) if remaining > 0 else requests.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(pending.items) > self.max_batch:
+                # Doesn't fit: it opens the next batch instead of overfilling this one
+                self._carry = pending
+                break
+            batch.append(pending)
+            size += len(pending.items)
+        self._last_batch = len(batch)
+        return batch
+
+    def _loop(self, requests):
+        # Nothing may escape this loop: a dead dispatcher leaves every later submit() blocked forever
+        while True:
+            batch = []
+            try:
+                batch = self._collect(requests)
+                items = [item for pending in batch for item in pending.items]
+                results = list(self.run(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: {len(results)} results for {len(items)} items")
+                start = 0
+                for pending in batch:
+                    pending.results = results[start:start + len(pending.items)]
+                    start += len(pending.items)
+            except Exception as e:
+                for pending in batch:
+                    pending.results = None
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+            if batch and self.on_batch is not None:
+                try:
+                    self.on_batch(len(batch), sum(len(pending.items) for pending in batch))
+                except Exception as e:
+                    logger.warning(f"{self.name}: on_batch callback failed: {e}")
@@ -0,0 +1,69 @@
+import os
+
+import cv2
+import numpy as np
+
+# MOTION_GATE=0 turns the gate off: every sampled video/camera frame goes through the models
+MOTION_GATE = os.environ.get("MOTION_GATE", "1") == "1"
+# Share of (downscaled) pixels that must differ from the background for a frame to be analyzed
+MOTION_THRESHOLD = float(os.environ.get("MOTION_THRESHOLD", "0.002"))
+# Grey-level difference for a pixel to count as changed
+MOTION_PIXEL_DELTA = int(os.environ.get("MOTION_PIXEL_DELTA", "25"))
+# Analyze at least every Nth frame even on a still scene, so tracks still update and end (0 = never force)
+MOTION_MAX_SKIP = int(os.environ.get("MOTION_MAX_SKIP", "25"))
+# Width frames are downscaled to before differencing
+MOTION_WIDTH = 320
+# How fast the background absorbs lasting changes (parked vehicles, daylight), per frame
+MOTION_LEARNING_RATE = 0.05
+
+
+class MotionGate:
+    """
+    Cheap scene-change test in front of the models for fixed cameras.
+
+    Each frame is downscaled, converted to grey and blurred, then compared
+    with a running-average background. The frame is analyzed when at least
+    `threshold` of its pixels differ by more than `pixel_delta` grey levels
+    (or after `max_skip` skipped frames in a row); otherwise the caller can
+    skip the whole pipeline for it.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, pixel_delta=MOTION_PIXEL_DELTA,
+                 max_skip=MOTION_MAX_SKIP, width=MOTION_WIDTH, learning_rate=MOTION_LEARNING_RATE):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.max_skip = max_skip
+        self.width = width
+        self.learning_rate = learning_rate
+        self.background = None
+        self.skipped_in_row = 0
+        self.last_change = None
+
+    def _small(self, bgr):
+        height, width = bgr.shape[:2]
+        if width > self.width:
+            bgr = cv2.resize(bgr, (self.width, max(1, round(height * self.width / width))),
+                             interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, bgr):
+        """
+        True when the frame should be analyzed
+        """
+        small = self._small(bgr)
+        if self.background is None or self.background.shape != small.shape:
+            self.background = small.astype(np.float32)
+            self.skipped_in_row = 0
+            self.last_change = 1.0
+            return True
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self.background))
+        self.last_change = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+        cv2.accumulateWeighted(small, self.background, self.learning_rate)
+
+        active = self.last_change >= self.threshold
+        if not active and self.max_skip and self.skipped_in_row >= self.max_skip:
+            active = True
+        self.skipped_in_row = 0 if active else self.skipped_in_row + 1
+        return active
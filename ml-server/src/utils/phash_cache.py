@@ -0,0 +1,56 @@
+import time
+
+import cv2
+import numpy as np
+
+from utils.lru_cache import LruCache
+
+
+def phash(gray, rows=8, cols=32):
+    """
+    DCT perceptual hash of a grayscale image as an int of rows * cols bits.
+
+    The default shape is wide because plates are: the low-frequency block of a
+    4x oversampled resize keeps enough horizontal detail to tell plates that
+    differ by one character apart, while sensor noise barely moves it
+    (a difference hash flips bits on flat plate backgrounds).
+    """
+    small = cv2.resize(np.asarray(gray), (cols * 4, rows * 4), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:rows, :cols]
+    bits = (low > np.median(low)).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PerceptualCache(LruCache):
+    """
+    Bounded LRU cache keyed by perceptual hash.
+
+    A lookup hits when a live stored hash is within max_distance bits of the
+    query, so near-identical frames of the same plate share one entry. Keep
+    max_distance small: plates one character apart can hash only a few bits
+    apart. Entries expire after ttl seconds; the least recently used entry is
+    evicted when the cache holds max_entries.
+    """
+
+    def __init__(self, max_entries=1024, ttl=600.0, max_distance=2):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+        self.max_distance = max_distance
+
+    def _find(self, key):
+        if key in self._entries:
+            return key
+        now = time.monotonic()
+        match = None
+        best = self.max_distance + 1
+        for stored, (_, expires_at) in self._entries.items():
+            # An expired entry must not shadow a live one a little further away
+            if expires_at is not None and expires_at < now:
+                continue
+            distance = hamming(stored, key)
+            if distance < best:
+                best, match = distance, stored
+        return match
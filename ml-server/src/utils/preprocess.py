@@ -2,10 +2,14 @@ import cv2
 import numpy as np
 from PIL import Image
 
+from utils.frame import FrameContext
+
 def load_image(image_file):
     """
-    Load image from Flask request file
+    Load image from Flask request file (or reuse an already decoded FrameContext)
     """
+    if isinstance(image_file, FrameContext):
+        return image_file.rgb
     image = Image.open(image_file).convert("RGB")
     return np.array(image)
 
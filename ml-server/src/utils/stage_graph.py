@@ -0,0 +1,95 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Threads shared by every request's concurrent stages (0 runs stages one after another on the caller)
+STAGE_WORKERS = int(os.environ.get("STAGE_WORKERS", "4"))
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def stage_pool():
+    """
+    Process-wide executor for stage branches, created on first use (and again after fork)
+    """
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+                _pool_pid = os.getpid()
+    return _pool
+
+
+class StageGraph:
+    """
+    A request pipeline as a small dependency graph of stages.
+
+    Each stage is fn(results) -> value, where results holds the values of the
+    stages it runs after. A stage starts as soon as its dependencies are done,
+    so independent branches (model inference and plate OCR) run concurrently;
+    torch, OpenCV and the OCR engines release the GIL, so the request takes
+    about as long as its longest branch. Of the stages that become ready
+    together, one runs inline on the calling (request) thread and only the
+    others go to the shared stage pool, so a request holds at most one pool
+    thread per extra branch and a busy pool can't stall its first branch.
+    Pooled stages run in a copy of the caller's context, so metric spans
+    still land in the request's trace.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, fn, after=()):
+        for dependency in after:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dependency}'")
+        self.stages[name] = (fn, tuple(after))
+        return self
+
+    def run(self):
+        """
+        Run every stage and return {name: value}; the first exception a stage raises is re-raised
+        """
+        results = {}
+        if STAGE_WORKERS <= 0:
+            # Dependencies are added before their dependents, so insertion order is a valid order
+            for name, (fn, _) in self.stages.items():
+                results[name] = fn(results)
+            return results
+
+        pool = stage_pool()
+        waiting = dict(self.stages)
+        running = {}
+        error = None
+        while waiting or running:
+            if error is None:
+                ready = [name for name, (_, after) in waiting.items() if all(d in results for d in after)]
+                for name in ready[1:]:
+                    fn, _ = waiting.pop(name)
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, fn, results)] = name
+                if ready:
+                    # The caller thread would only block on the pool: it runs this branch itself
+                    fn, _ = waiting.pop(ready[0])
+                    try:
+                        results[ready[0]] = fn(results)
+                    except Exception as e:
+                        error = e
+                    continue
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    # Let the stages already running finish, start nothing new
+                    error = error or e
+        if error is not None:
+            raise error
+        return results
@@ -0,0 +1,73 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Measured from the first import of this module (app.py imports it first)
+STARTED_AT = time.time()
+_started = time.perf_counter()
+
+_spans = []
+_lock = threading.Lock()
+_ready_after = None
+
+
+@contextmanager
+def timed(kind, name):
+    """
+    Record how long the block takes as one startup step (kind: import, model, ocr, warmup)
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span = {
+            "kind": kind,
+            "name": name,
+            "seconds": round(time.perf_counter() - start, 4),
+            "at": round(start - _started, 4),
+            "pid": os.getpid(),
+        }
+        if error:
+            span["error"] = error
+        with _lock:
+            _spans.append(span)
+
+
+def mark_ready():
+    global _ready_after
+    _ready_after = round(time.perf_counter() - _started, 4)
+
+
+def startup_report():
+    """
+    Startup breakdown: every timed step plus totals per kind
+    """
+    with _lock:
+        spans = list(_spans)
+    totals = {}
+    for span in spans:
+        totals[span["kind"]] = round(totals.get(span["kind"], 0.0) + span["seconds"], 4)
+    return {
+        "started_at": STARTED_AT,
+        "uptime": round(time.perf_counter() - _started, 4),
+        "ready_after": _ready_after,
+        "totals": totals,
+        "steps": spans,
+    }
+
+
+def log_startup_report():
+    report = startup_report()
+    lines = [f"Startup breakdown (ready after {report['ready_after']}s):"]
+    for span in sorted(report["steps"], key=lambda s: s["seconds"], reverse=True):
+        status = f"  FAILED {span['error']}" if "error" in span else ""
+        lines.append(f"  {span['seconds']:8.3f}s  {span['kind']:<7} {span['name']}{status}")
+    logger.info("\n".join(lines), extra={"ready_after": report["ready_after"], "totals": report["totals"]})
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+import time
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Seconds between reconnect attempts on a live source, doubled after each failure up to the max
+STREAM_RECONNECT_DELAY = float(os.environ.get("STREAM_RECONNECT_DELAY", "2"))
+STREAM_MAX_RECONNECT_DELAY = float(os.environ.get("STREAM_MAX_RECONNECT_DELAY", "30"))
+
+
+def open_capture(source):
+    """
+    cv2.VideoCapture for a camera URL (rtsp://, http:// MJPEG), a file path or a device index ("0")
+    """
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    cap = cv2.VideoCapture(source)
+    # Live sources: keep the driver's own queue short so frames are not stale before we see them
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class LatestFrameReader:
+    """
+    Decodes a camera stream on its own thread and keeps only the newest frame.
+
+    The consumer calls read() whenever it is ready for more work and gets the
+    latest decoded frame; frames decoded in between are dropped instead of
+    queued, so a consumer slower than the camera never falls further behind.
+
+    Files are replayed at their native frame rate (realtime=True) so they
+    behave like a camera; live sources (URLs, device indexes) are reopened
+    with backoff when the connection drops. Frames are (index, timestamp,
+    bgr_ndarray), the timestamp being the position in seconds for files and
+    wall-clock time otherwise.
+    """
+
+    def __init__(self, source, realtime=None, reconnect=None):
+        self.source = source
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        live = not isinstance(source, str) or source.isdigit() or "://" in source
+        self.realtime = self.is_file if realtime is None else realtime
+        self.reconnect = live if reconnect is None else reconnect
+        self.fps = 0.0
+        self.error = None
+        self.stats = {"read": 0, "delivered": 0, "dropped": 0, "reconnects": 0}
+
+        self._latest = None
+        self._delivered_index = -1
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stream-reader", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def read(self, timeout=None):
+        """
+        Block until a frame newer than the last one returned is available.
+        Returns None once the source has ended (or the reader was stopped).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                latest = self._latest
+                if latest is not None and latest[0] > self._delivered_index:
+                    self._delivered_index = latest[0]
+                    self.stats["delivered"] += 1
+                    return latest
+                if self._finished or self._stop.is_set():
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No frame from {self.source} within {timeout}s")
+                self._cond.wait(remaining)
+
+    def _publish(self, index, timestamp, image):
+        with self._cond:
+            if self._latest is not None and self._latest[0] > self._delivered_index:
+                self.stats["dropped"] += 1
+            self._latest = (index, timestamp, image)
+            self.stats["read"] += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        index = 0
+        delay = STREAM_RECONNECT_DELAY
+        try:
+            while not self._stop.is_set():
+                cap = open_capture(self.source)
+                if not cap.isOpened():
+                    cap.release()
+                    self.error = f"Could not open stream {self.source}"
+                    if not self.reconnect:
+                        break
+                    logger.warning(f"{self.error}, retrying in {delay:.0f}s")
+                    self._stop.wait(delay)
+                    delay = min(delay * 2, STREAM_MAX_RECONNECT_DELAY)
+                    continue
+
+                self.error = None
+                delay = STREAM_RECONNECT_DELAY
+                self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+                paced = self.realtime and self.fps > 0
+                started = time.monotonic()
+                position = 0
+                try:
+                    while not self._stop.is_set():
+                        ok, image = cap.read()
+                        if not ok:
+                            break
+                        if self.is_file:
+                            timestamp = position / self.fps if self.fps > 0 else None
+                        else:
+                            timestamp = time.time()
+                        self._publish(index, timestamp, image)
+                        index += 1
+                        position += 1
+                        if paced:
+                            wait = started + position / self.fps - time.monotonic()
+                            if wait > 0:
+                                self._stop.wait(wait)
+                finally:
+                    cap.release()
+
+                if not self.reconnect or self._stop.is_set():
+                    break
+                self.stats["reconnects"] += 1
+                logger.warning(f"Stream {self.source} ended, reconnecting")
+        except Exception as e:
+            self.error = str(e)
+            logger.exception(f"Stream reader for {self.source} crashed")
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
@@ -0,0 +1,168 @@
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Pairwise IoU between two (N, 4) / (M, 4) arrays of x1, y1, x2, y2 boxes
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def center_distance_matrix(boxes_a, boxes_b):
+    """
+    Pairwise distance between the centres of two (N, 4) / (M, 4) arrays of x1, y1, x2, y2 boxes
+    """
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    ca = np.stack([(a[:, 0] + a[:, 2]) / 2, (a[:, 1] + a[:, 3]) / 2], axis=1)
+    cb = np.stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2], axis=1)
+    return np.hypot(ca[:, None, 0] - cb[None, :, 0], ca[:, None, 1] - cb[None, :, 1])
+
+
+class Track:
+    """
+    One tracked vehicle. `state` is free for the caller to keep per-track results in.
+    """
+
+    def __init__(self, track_id, detection, frame_index):
+        self.id = track_id
+        self.box = _box(detection)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.detection = detection
+        self.hits = 1
+        self.misses = 0
+        self.first_frame = frame_index
+        self.last_frame = frame_index
+        self.state = {}
+
+    def predict(self, frame_index):
+        """
+        Constant-velocity guess of where the box is at frame_index.
+        Velocity is per frame, so sampled (strided) or skipped frames are accounted for.
+        """
+        return self.box + self.velocity * max(0, frame_index - self.last_frame)
+
+    def update(self, detection, frame_index):
+        box = _box(detection)
+        steps = max(1, frame_index - self.last_frame)
+        step_velocity = (box - self.box) / steps
+        if self.hits == 1:
+            # First displacement: nothing to smooth against yet
+            self.velocity = step_velocity
+        else:
+            # Smooth velocity so one jittery box doesn't throw the prediction off
+            self.velocity = 0.5 * self.velocity + 0.5 * step_velocity
+        self.box = box
+        self.detection = detection
+        self.hits += 1
+        self.misses = 0
+        self.last_frame = frame_index
+
+
+class IouTracker:
+    """
+    Lightweight SORT-style tracker: greedy IoU association between
+    constant-velocity predictions and the current frame's detections.
+
+    A track seen only once has no velocity yet, so at a frame stride a fast
+    vehicle's next box may not overlap its first one at all. Such tracks fall
+    back to matching the nearest leftover detection whose centre is within
+    max_center_shift box diagonals.
+
+    Detections are dicts with x1/y1/x2/y2 keys (as returned by detect_vehicles).
+    Tracks not matched for more than max_misses updates are finished.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=3, max_center_shift=1.0):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.max_center_shift = max_center_shift
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, detections, frame_index):
+        """
+        Associate detections with tracks.
+        Returns (matched_tracks, finished_tracks) for this frame.
+        """
+        matched = []
+        unmatched_dets = set(range(len(detections)))
+
+        if self.tracks and detections:
+            boxes = np.stack([_box(d) for d in detections])
+            predicted = np.stack([t.predict(frame_index) for t in self.tracks])
+            ious = iou_matrix(predicted, boxes)
+            # Greedy association, best overlaps first
+            pairs = np.argwhere(ious >= self.iou_threshold)
+            order = np.argsort(-ious[pairs[:, 0], pairs[:, 1]])
+            used_tracks = set()
+            for t_idx, d_idx in pairs[order]:
+                if t_idx in used_tracks or d_idx not in unmatched_dets:
+                    continue
+                track = self.tracks[t_idx]
+                track.update(detections[d_idx], frame_index)
+                used_tracks.add(t_idx)
+                unmatched_dets.discard(d_idx)
+                matched.append(track)
+
+            # Velocity-less tracks left over: greedy nearest-centre association
+            fresh = [i for i, t in enumerate(self.tracks) if i not in used_tracks and t.hits == 1]
+            if fresh and unmatched_dets and self.max_center_shift > 0:
+                dets = sorted(unmatched_dets)
+                distances = center_distance_matrix(predicted[fresh], boxes[dets])
+                diagonals = np.hypot(predicted[fresh, 2] - predicted[fresh, 0],
+                                     predicted[fresh, 3] - predicted[fresh, 1])
+                pairs = np.argwhere(distances <= self.max_center_shift * diagonals[:, None])
+                order = np.argsort(distances[pairs[:, 0], pairs[:, 1]], kind='stable')
+                for f_idx, j in pairs[order]:
+                    t_idx, d_idx = fresh[f_idx], dets[j]
+                    if t_idx in used_tracks or d_idx not in unmatched_dets:
+                        continue
+                    track = self.tracks[t_idx]
+                    track.update(detections[d_idx], frame_index)
+                    used_tracks.add(t_idx)
+                    unmatched_dets.discard(d_idx)
+                    matched.append(track)
+
+        for track in self.tracks:
+            if track.last_frame != frame_index:
+                track.misses += 1
+
+        for d_idx in sorted(unmatched_dets):
+            track = Track(self._next_id, detections[d_idx], frame_index)
+            self._next_id += 1
+            self.tracks.append(track)
+            matched.append(track)
+
+        finished = [t for t in self.tracks if t.misses > self.max_misses]
+        if finished:
+            self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        return matched, finished
+
+    def flush(self):
+        """
+        Finish and return every remaining track (end of stream)
+        """
+        finished, self.tracks = self.tracks, []
+        return finished
+
+
+def _box(detection):
+    return np.array(
+        [detection['x1'], detection['y1'], detection['x2'], detection['y2']],
+        dtype=np.float32,
+    )
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+
+import cv2
+
+# Sample every Nth frame when neither stride nor fps is requested
+DEFAULT_STRIDE = 5
+CHUNK_SIZE = 1024 * 1024
+
+
+def save_upload(file_storage, directory=None):
+    """
+    Stream an uploaded file to a temporary path on disk in fixed-size chunks.
+    The caller is responsible for deleting the returned path.
+    """
+    filename = getattr(file_storage, "filename", "") or ""
+    suffix = os.path.splitext(filename)[1] or ".mp4"
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            shutil.copyfileobj(file_storage.stream, out, CHUNK_SIZE)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise ValueError("Could not open video")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        return {
+            "fps": float(fps),
+            "frame_count": frame_count,
+            "duration": float(frame_count / fps) if fps > 0 else None,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0),
+        }
+    finally:
+        cap.release()
+
+
+def sampling_step(source_fps, stride=None, fps=None):
+    """
+    Number of source frames between two sampled frames
+    """
+    if fps:
+        if source_fps and source_fps > 0:
+            return max(1, int(round(source_fps / float(fps))))
+        return DEFAULT_STRIDE
+    return max(1, int(stride or DEFAULT_STRIDE))
+
+
+def iter_frames(path, stride=None, fps=None):
+    """
+    Yield (frame_index, timestamp_seconds, bgr_ndarray) for sampled frames.
+    Skipped frames are only grabbed, not decoded, and nothing is buffered.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        cap.release()
+        raise ValueError("Could not open video")
+    try:
+        source_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        step = sampling_step(source_fps, stride=stride, fps=fps)
+        index = 0
+        while True:
+            if not cap.grab():
+                break
+            if index % step == 0:
+                ok, image = cap.retrieve()
+                if not ok:
+                    break
+                timestamp = index / source_fps if source_fps > 0 else None
+                yield index, timestamp, image
+            index += 1
+    finally:
+        cap.release()
+
+
+def iter_batches(iterable, size):
+    """
+    Group an iterable into lists of at most size items
+    """
+    size = max(1, int(size))
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,83 @@
+import os
+import sys
+from types import SimpleNamespace
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from utils import lru_cache, phash_cache
+from utils.lru_cache import LruCache
+from utils.phash_cache import PerceptualCache, hamming
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Manual monotonic clock for both cache modules; advance it with clock.now += seconds
+    """
+    clock = SimpleNamespace(now=1000.0)
+    fake_time = SimpleNamespace(monotonic=lambda: clock.now)
+    monkeypatch.setattr(lru_cache, "time", fake_time)
+    monkeypatch.setattr(phash_cache, "time", fake_time)
+    return clock
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LruCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 3, 1, 1)
+
+
+def test_lru_entries_expire_after_ttl(clock):
+    cache = LruCache(ttl=10)
+    cache.put("a", 1)
+    clock.now += 9
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_disabled_stores_nothing():
+    cache = LruCache(max_entries=0)
+    cache.put("a", 1)
+    assert not cache.enabled
+    assert cache.get("a") is None
+
+
+def test_perceptual_cache_matches_nearby_hashes():
+    cache = PerceptualCache(max_distance=2)
+    cache.put(0b1111_0000, "MH20DY2366")
+    assert cache.get(0b1111_0011) == "MH20DY2366"
+    assert cache.get(0b1111_0111) is None
+
+
+def test_perceptual_cache_prefers_closest_hash():
+    cache = PerceptualCache(max_distance=2)
+    cache.put(0b0000, "far")
+    cache.put(0b0111, "near")
+    assert hamming(0b0011, 0b0000) == hamming(0b0011, 0b0111) + 1
+    assert cache.get(0b0011) == "near"
+
+
+def test_expired_entry_does_not_shadow_live_one(clock):
+    cache = PerceptualCache(ttl=10, max_distance=2)
+    cache.put(0b0001, "old")
+    clock.now += 5
+    cache.put(0b0111, "live")
+    clock.now += 6
+
+    # "old" is the closer hash but has expired
+    assert cache.get(0b0000) is None
+    assert cache.get(0b0011) == "live"
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+import pytest
+
+import pipeline
+from detector import helmet_detector
+
+BIKE = {'x1': 20, 'y1': 20, 'x2': 120, 'y2': 140, 'confidence': 0.9, 'class': 'motorcycle', 'type': 'bike'}
+
+
+def frame():
+    return np.full((240, 320, 3), 90, dtype=np.uint8)
+
+
+@pytest.fixture
+def broken_helmet_model(monkeypatch):
+    """
+    Bike frames whose helmet model raises on load and on inference
+    """
+    def fail(*args, **kwargs):
+        raise RuntimeError("helmet weights corrupt")
+
+    monkeypatch.setattr(helmet_detector, "get_model", fail)
+    monkeypatch.setattr(helmet_detector, "predict", fail)
+    monkeypatch.setattr(helmet_detector, "predict_batch", fail)
+    monkeypatch.setattr(pipeline, "classify_vehicle_batch", lambda frames: ["bike"] * len(frames))
+    monkeypatch.setattr(pipeline, "detect_vehicles", lambda frame: [dict(BIKE)])
+    monkeypatch.setattr(pipeline, "predict_batch", lambda *args, **kwargs: None)
+    monkeypatch.setattr(pipeline, "extract_vehicle_number", lambda image, **kwargs: "Unknown")
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    pytest.importorskip("flask")
+    os.environ.setdefault("ML_JOBS_DIR", tempfile.mkdtemp())
+    os.environ.setdefault("ML_BACKGROUND_INIT", "0")
+    import app
+    monkeypatch.setattr(app, "unavailable_error", lambda: None)
+    return app
+
+
+def test_failed_helmet_check_is_reported_not_fined(broken_helmet_model):
+    result = pipeline.analyze_frames([frame()], ocr=False)[0]
+    assert result["violation"] is False
+    assert result["fine"] == 0
+    assert any("Helmet detection failed" in e for e in result["errors"])
+
+
+def test_failed_helmet_check_per_vehicle(broken_helmet_model):
+    summary = pipeline.analyze_vehicles([frame()], ocr=False)[0]
+    assert summary["violation"] is False
+    vehicle = summary["vehicles"][0]
+    assert vehicle["fine"] == 0
+    assert any("Helmet detection failed" in e for e in vehicle["errors"])
+
+
+def test_failed_helmet_check_is_not_a_track_vote(broken_helmet_model):
+    analyzer = pipeline.TrackedAnalyzer()
+    events = []
+    for index in range(5):
+        events += analyzer.process(frame(), index)
+    events += analyzer.flush()
+    assert events == []
+    assert analyzer.stats["checks"] == 0
+    assert analyzer.stats["check_errors"] == 5
+
+
+def test_failed_helmet_check_is_not_cached(broken_helmet_model, app_module):
+    assert not app_module.cacheable(pipeline.analyze_frames([frame()], ocr=False)[0])
+    assert not app_module.cacheable(pipeline.analyze_vehicles([frame()], ocr=False)[0])
+
+
+def test_cacheable(app_module):
+    healthy = {"vehicle": "bike", "violation": True, "fine": 500, "vehicleNumber": "MH20DY2366"}
+    assert app_module.cacheable(healthy)
+    assert app_module.cacheable({"mode": "vehicles", "vehicles": [healthy]})
+    assert not app_module.cacheable(dict(healthy, vehicleNumber="DETECT_FAILED"))
+    assert not app_module.cacheable(dict(healthy, errors=["Vehicle detection failed: boom"]))
+    assert not app_module.cacheable({"mode": "vehicles", "vehicles": [healthy, dict(healthy, errors=["x"])]})
+    assert not app_module.cacheable({"error": "Invalid image"})
+
+
+def test_unavailable_models_are_not_cached(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "unavailable_error", lambda: "Could not load model 'helmet'")
+    assert not app_module.cacheable({"vehicle": "car", "vehicleNumber": "MH20DY2366"})
@@ -0,0 +1,66 @@
+import os
+import sys
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from utils.ingest import open_shared_file, resolve_shared_path
+
+
+@pytest.fixture
+def shared(tmp_path):
+    root = tmp_path / "shared"
+    (root / "cam1").mkdir(parents=True)
+    (root / "cam1" / "frame.jpg").write_bytes(b"jpeg bytes")
+    (root / "empty.jpg").write_bytes(b"")
+    (tmp_path / "secret.txt").write_text("outside")
+    return root
+
+
+def test_relative_and_absolute_paths_inside_root(shared):
+    expected = os.path.realpath(shared / "cam1" / "frame.jpg")
+    assert resolve_shared_path("cam1/frame.jpg", str(shared)) == expected
+    assert resolve_shared_path(expected, str(shared)) == expected
+
+
+@pytest.mark.parametrize("path", ["../secret.txt", "cam1/../../secret.txt", "/etc/passwd"])
+def test_paths_escaping_root_are_refused(shared, path):
+    with pytest.raises(PermissionError):
+        resolve_shared_path(path, str(shared))
+
+
+def test_symlink_out_of_root_is_refused(shared):
+    os.symlink(shared.parent / "secret.txt", shared / "link.txt")
+    with pytest.raises(PermissionError):
+        resolve_shared_path("link.txt", str(shared))
+
+
+def test_sibling_directory_with_root_prefix_is_refused(shared):
+    # ".../shared-other" starts with the root's path string but is not inside it
+    other = shared.parent / "shared-other"
+    other.mkdir()
+    (other / "frame.jpg").write_bytes(b"x")
+    with pytest.raises(PermissionError):
+        resolve_shared_path("../shared-other/frame.jpg", str(shared))
+
+
+def test_ingest_disabled_without_root(shared):
+    with pytest.raises(PermissionError, match="disabled"):
+        resolve_shared_path("cam1/frame.jpg", "")
+
+
+def test_missing_file_and_directory(shared):
+    with pytest.raises(FileNotFoundError):
+        resolve_shared_path("cam1/missing.jpg", str(shared))
+    with pytest.raises(FileNotFoundError):
+        resolve_shared_path("cam1", str(shared))
+
+
+def test_open_shared_file_reads_contents(shared):
+    with open_shared_file("cam1/frame.jpg", str(shared)) as data:
+        assert bytes(data) == b"jpeg bytes"
+    with pytest.raises(ValueError, match="empty"):
+        with open_shared_file("empty.jpg", str(shared)):
+            pass
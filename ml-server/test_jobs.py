@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+import jobs
+
+
+@pytest.fixture
+def store(tmp_path):
+    return jobs.JobStore(str(tmp_path))
+
+
+def spooled(store, kind="video"):
+    path = store.spool_path(".mp4")
+    with open(path, "wb") as f:
+        f.write(b"video")
+    return store.submit(kind, path, {"stride": 5}), path
+
+
+def go_stale(monkeypatch):
+    # Every running job now looks orphaned
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", -1)
+
+
+def test_claims_oldest_queued_job_once(store):
+    first, _ = spooled(store)
+    time.sleep(0.01)
+    second, _ = spooled(store)
+
+    claimed = store.claim_next()
+    assert claimed["job_id"] == first
+    assert claimed["status"] == jobs.RUNNING
+    assert claimed["attempts"] == 1
+    assert store.claim_next()["job_id"] == second
+    assert store.claim_next() is None
+
+
+def test_finish_removes_spooled_input(store):
+    job_id, path = spooled(store)
+    job = store.claim_next()
+    assert store.finish(job_id, jobs.DONE, result={"events": []}, attempt=job["attempts"])
+    assert not os.path.exists(path)
+    finished = store.get(job_id, with_result=True)
+    assert finished["status"] == jobs.DONE
+    assert finished["progress"] == 1.0
+    assert finished["result"] == {"events": []}
+
+
+def test_stale_job_is_requeued_and_claimed_again(store, monkeypatch):
+    job_id, path = spooled(store)
+    store.claim_next()
+
+    go_stale(monkeypatch)
+    reclaimed = store.claim_next()
+    assert reclaimed["job_id"] == job_id
+    assert reclaimed["attempts"] == 2
+    assert os.path.exists(path)
+
+
+def test_requeued_run_loses_its_claim(store, monkeypatch):
+    job_id, _ = spooled(store)
+    old = store.claim_next()["attempts"]
+    go_stale(monkeypatch)
+    new = store.claim_next()["attempts"]
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", 300)
+
+    # The orphaned run is told to stop and cannot overwrite the new run's outcome
+    assert store.heartbeat(job_id, 0.5, old) is True
+    assert store.finish(job_id, jobs.FAILED, error="late", attempt=old) is False
+    assert store.heartbeat(job_id, 0.5, new) is False
+    assert store.finish(job_id, jobs.DONE, result={}, attempt=new) is True
+    assert store.get(job_id)["status"] == jobs.DONE
+
+
+def test_job_orphaned_too_often_fails_and_drops_input(store, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 2)
+    job_id, path = spooled(store)
+    store.claim_next()
+    go_stale(monkeypatch)
+    store.claim_next()
+
+    assert store.claim_next() is None
+    failed = store.get(job_id)
+    assert failed["status"] == jobs.FAILED
+    assert failed["error"] == "Worker died while running the job"
+    assert not os.path.exists(path)
+
+
+def test_cancel_is_seen_by_heartbeat(store):
+    job_id, _ = spooled(store)
+    attempt = store.claim_next()["attempts"]
+    assert store.heartbeat(job_id, None, attempt) is False
+    store.cancel(job_id)
+    assert store.heartbeat(job_id, None, attempt) is True
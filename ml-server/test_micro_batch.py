@@ -0,0 +1,90 @@
+import os
+import sys
+import threading
+import time
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from utils.micro_batch import MicroBatcher
+
+
+def concurrently(batcher, submissions):
+    """
+    Submit every item list from its own thread; returns results (or raised errors) in order
+    """
+    results = [None] * len(submissions)
+    start = threading.Barrier(len(submissions))
+
+    def call(index, items):
+        start.wait()
+        try:
+            results[index] = batcher.submit(items)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(i, items)) for i, items in enumerate(submissions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def slow_double(items):
+    time.sleep(0.02)
+    return [item * 2 for item in items]
+
+
+def test_each_caller_gets_its_own_slice():
+    batches = []
+    batcher = MicroBatcher(slow_double, max_batch=16, max_wait=0.05, on_batch=lambda calls, items: batches.append(calls))
+    submissions = [[i, i + 100] for i in range(8)]
+
+    assert concurrently(batcher, submissions) == [[i * 2, (i + 100) * 2] for i in range(8)]
+    assert sum(batches) == 8
+    assert len(batches) < 8
+
+
+def test_batches_never_exceed_max_batch():
+    sizes = []
+    batcher = MicroBatcher(slow_double, max_batch=3, max_wait=0.05, on_batch=lambda calls, items: sizes.append(items))
+    assert concurrently(batcher, [[i, i] for i in range(6)]) == [[i * 2, i * 2] for i in range(6)]
+    assert max(sizes) <= 3
+
+
+def test_lone_caller_does_not_wait():
+    batcher = MicroBatcher(lambda items: items, max_wait=1.0)
+    batcher.submit([0])
+    started = time.monotonic()
+    assert batcher.submit([1, 2]) == [1, 2]
+    assert time.monotonic() - started < 0.5
+
+
+def test_error_is_confined_to_its_batch():
+    def run(items):
+        if "bad" in items:
+            raise ValueError("corrupt frame")
+        return items
+
+    batcher = MicroBatcher(run, max_wait=0)
+    with pytest.raises(ValueError):
+        batcher.submit(["bad"])
+    assert batcher.submit(["good"]) == ["good"]
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = MicroBatcher(lambda items: items[:-1], max_wait=0)
+    with pytest.raises(RuntimeError, match="1 results for 2 items"):
+        batcher.submit([1, 2])
+
+
+def test_failing_on_batch_callback_keeps_dispatcher_alive():
+    def on_batch(calls, items):
+        raise RuntimeError("metrics down")
+
+    batcher = MicroBatcher(lambda items: items, max_wait=0, on_batch=on_batch)
+    assert batcher.submit([1]) == [1]
+    assert batcher.submit([2]) == [2]
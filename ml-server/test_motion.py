@@ -0,0 +1,64 @@
+import os
+import sys
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+
+from utils.motion import MotionGate
+
+
+def street(vehicle_x=None):
+    """
+    720p grey scene, optionally with a bright 200x120 vehicle at vehicle_x
+    """
+    frame = np.full((720, 1280, 3), 80, dtype=np.uint8)
+    if vehicle_x is not None:
+        frame[400:520, vehicle_x:vehicle_x + 200] = 230
+    return frame
+
+
+def noisy(frame, seed):
+    # Sensor noise well below the pixel delta
+    rng = np.random.default_rng(seed)
+    return np.clip(frame.astype(np.int16) + rng.integers(-4, 5, frame.shape), 0, 255).astype(np.uint8)
+
+
+def test_first_frame_is_analyzed():
+    assert MotionGate().check(street()) is True
+
+
+def test_still_scene_is_skipped():
+    gate = MotionGate(max_skip=0)
+    gate.check(street())
+    assert not any(gate.check(noisy(street(), seed)) for seed in range(10))
+    assert gate.last_change < gate.threshold
+
+
+def test_vehicle_entering_is_analyzed():
+    gate = MotionGate(max_skip=0)
+    gate.check(street())
+    assert gate.check(street()) is False
+    assert gate.check(street(vehicle_x=500)) is True
+
+
+def test_still_scene_is_analyzed_every_max_skip_frames():
+    gate = MotionGate(max_skip=3)
+    gate.check(street())
+    assert [gate.check(street()) for _ in range(8)] == [False, False, False, True, False, False, False, True]
+
+
+def test_parked_vehicle_becomes_background():
+    gate = MotionGate(max_skip=0, learning_rate=0.5)
+    gate.check(street())
+    parked = street(vehicle_x=500)
+    assert gate.check(parked) is True
+    checks = [gate.check(parked) for _ in range(10)]
+    assert checks[-1] is False
+
+
+def test_resolution_change_resets_background():
+    gate = MotionGate()
+    gate.check(street())
+    assert gate.check(np.full((480, 640, 3), 80, dtype=np.uint8)) is True
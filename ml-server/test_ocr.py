@@ -1,4 +1,10 @@
-from src.detector.license_plate_detector import extract_vehicle_number, set_ocr_globals
+import os
+import sys
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from detector.license_plate_detector import extract_vehicle_number, set_ocr_globals
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import numpy as np
 import cv2
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import pytest
+
+from utils import stage_graph
+from utils.stage_graph import StageGraph
+
+
+@pytest.fixture(params=[4, 0], ids=["pooled", "sequential"])
+def workers(request, monkeypatch):
+    monkeypatch.setattr(stage_graph, "STAGE_WORKERS", request.param)
+    return request.param
+
+
+def test_dependents_see_their_inputs(workers):
+    graph = (
+        StageGraph()
+        .add("decode", lambda _: 2)
+        .add("detect", lambda r: r["decode"] * 10, after=("decode",))
+        .add("ocr", lambda r: r["decode"] + 1, after=("decode",))
+        .add("merge", lambda r: (r["detect"], r["ocr"]), after=("detect", "ocr"))
+    )
+    assert graph.run() == {"decode": 2, "detect": 20, "ocr": 3, "merge": (20, 3)}
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown stage 'decode'"):
+        StageGraph().add("detect", lambda r: None, after=("decode",))
+
+
+def test_one_ready_branch_runs_on_the_caller(monkeypatch):
+    monkeypatch.setattr(stage_graph, "STAGE_WORKERS", 4)
+    threads = {}
+
+    def record(name):
+        def stage(_):
+            threads[name] = threading.get_ident()
+            time.sleep(0.02)
+        return stage
+
+    StageGraph().add("a", record("a")).add("b", record("b")).add("c", record("c")).run()
+    caller = threading.get_ident()
+    assert threads["a"] == caller
+    assert threads["b"] != caller and threads["c"] != caller
+
+
+def test_independent_branches_overlap(monkeypatch):
+    monkeypatch.setattr(stage_graph, "STAGE_WORKERS", 4)
+    started = time.monotonic()
+    StageGraph().add("a", lambda _: time.sleep(0.2)).add("b", lambda _: time.sleep(0.2)).run()
+    assert time.monotonic() - started < 0.35
+
+
+def test_stage_error_is_raised_and_dependents_skipped(workers):
+    ran = []
+
+    def broken(_):
+        raise RuntimeError("model crashed")
+
+    graph = (
+        StageGraph()
+        .add("detect", broken)
+        .add("ocr", lambda _: ran.append("ocr"))
+        .add("merge", lambda _: ran.append("merge"), after=("detect", "ocr"))
+    )
+    with pytest.raises(RuntimeError, match="model crashed"):
+        graph.run()
+    assert "merge" not in ran
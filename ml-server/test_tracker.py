@@ -0,0 +1,62 @@
+import os
+import sys
+
+# Detector modules import their helpers as top-level packages (detector.*, utils.*)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import numpy as np
+
+from utils.tracker import IouTracker
+
+FPS = 25
+FRAME_WIDTH = 1920
+
+
+def crossing(start_x, y, width, height, speed, frames, stride, jitter=0.0, seed=0):
+    """
+    (frame_index, detection) for a vehicle crossing the frame at speed px/frame, sampled every stride frames
+    """
+    rng = np.random.default_rng(seed)
+    for index in range(0, frames, stride):
+        x1 = start_x + speed * index + rng.uniform(-jitter, jitter)
+        y1 = y + rng.uniform(-jitter, jitter)
+        if x1 + width > FRAME_WIDTH:
+            break
+        yield index, {'x1': x1, 'y1': y1, 'x2': x1 + width, 'y2': y1 + height}
+
+
+def run_tracker(tracker, detections_per_frame):
+    finished = []
+    for index, detections in detections_per_frame:
+        finished += tracker.update(detections, index)[1]
+    return finished + tracker.flush()
+
+
+def test_fast_bike_at_stride_is_one_track():
+    # 150 px bike crossing a 1920 px frame in 3 s at 25 fps (~25 px/frame), every 5th frame analyzed
+    speed = (FRAME_WIDTH - 150) / (3 * FPS)
+    frames = [(i, [d]) for i, d in crossing(0, 600, 150, 110, speed, 3 * FPS, stride=5, jitter=3)]
+    assert len(frames) > 10
+
+    tracks = run_tracker(IouTracker(), frames)
+    assert len(tracks) == 1
+    assert tracks[0].hits == len(frames)
+
+
+def test_crossing_bike_and_parked_car_stay_apart():
+    speed = (FRAME_WIDTH - 150) / (3 * FPS)
+    bike = dict(crossing(0, 300, 150, 110, speed, 3 * FPS, stride=5, jitter=3, seed=1))
+    car = {'x1': 900, 'y1': 700, 'x2': 1300, 'y2': 950}
+    frames = [(i, [bike[i], car] if i in bike else [car]) for i in range(0, 3 * FPS, 5)]
+
+    tracks = run_tracker(IouTracker(), frames)
+    assert len(tracks) == 2
+    assert sorted(t.hits for t in tracks) == sorted([len(bike), len(frames)])
+
+
+def test_prediction_scales_with_frame_gap():
+    tracker = IouTracker()
+    tracker.update([{'x1': 0, 'y1': 0, 'x2': 100, 'y2': 50}], 0)
+    tracker.update([{'x1': 50, 'y1': 0, 'x2': 150, 'y2': 50}], 5)
+    track = tracker.tracks[0]
+    np.testing.assert_allclose(track.predict(10), [100, 0, 200, 50])